@@ -1,6 +1,11 @@
 from functools import partial
 import threading
+import queue
+import heapq
+import collections
+import concurrent.futures
 import selectors
+import asyncio
 import argparse
 import os
 import shutil
@@ -12,11 +17,10 @@ import subprocess
 import time
 from http import server, client, HTTPStatus
 import socket
-import socketserver
 import ssl
 import urllib.request, urllib.parse, urllib.error
 from io import BytesIO
-from xml.dom import minidom
+from xml.parsers import expat
 import json
 import html
 import struct
@@ -79,11 +83,13 @@ FR_STRINGS = {
     'alreadyactivated': 'Serveur d\'écoute des notifications d\'événement de %s DLNA à l\'adresse %s:%s déjà activée',
     'receipt': 'DLNA Renderer %s -> service %s -> réception de la notification d\'événement %s',
     'notification': 'DLNA Renderer %s -> Service %s -> notification d\'événement %s -> %s est passé à %s',
-    'alert': 'DLNA Renderer %s -> Service %s -> notification d\'événement %s -> alerte: %s est passé à %s'
+    'alert': 'DLNA Renderer %s -> Service %s -> notification d\'événement %s -> alerte: %s est passé à %s',
+    'dropped': 'Notification d\'événement reçue de %s:%s rejetée en raison de la saturation de la file de traitement'
   },
   'dlnaadvertisement': {
     'receipt': 'Réception, sur l\'interface %s, d\'une publicité du périphérique %s (%s:%s): %s',
     'ignored': 'Publicité du périphérique %s (%s:%s) ignorée en raison de la discordance d\'adresse de l\'URL de description',
+    'dropped': 'Publicité reçue sur l\'interface %s de %s:%s abandonnée en raison de la saturation de la file de traitement',
     'set': 'Mise en place de l\'écoute des publicités de périphérique DLNA sur l\'interface %s',
     'fail': 'Échec de la mise en place de l\'écoute des publicités de périphérique DLNA sur l\'interface %s',
     'alreadyactivated': 'Écoute des publicités de périphérique DLNA déjà activée',
@@ -93,6 +99,7 @@ FR_STRINGS = {
   'dlnahandler': {
     'ip_failure': 'Échec de la récupération de l\'adresse ip de l\'hôte',
     'registering': 'Enregistrement du %s %s sur l\'interface %s',
+    'cachehit': '%s %s -> description récupérée du cache',
     'msearch1': 'Envoi d\'un message de recherche de uuid:%s',
     'msearch2': 'Envoi d\'un message de recherche de périphérique DLNA',
     'msearch3': 'Envoi d\'un message de recherche de %s DLNA',
@@ -105,20 +112,34 @@ FR_STRINGS = {
     'stop': 'Fin de la recherche de %s DLNA',
     'commandabandonment': '%s %s -> service %s -> abandon de l\'envoi de la commande %s',
     'commandsending': '%s %s -> service %s -> envoi de la commande %s',
+    'commandcoalesced': '%s %s -> service %s -> commande %s en attente remplacée par la plus récente',
     'commandfailure': '%s %s -> service %s -> échec de l\'envoi de la commande %s',
+    'commandrejected': '%s %s -> service %s -> commande %s rejetée: disjoncteur ouvert',
+    'commandfault': '%s %s -> service %s -> erreur SOAP en réponse à la commande %s: %s %s',
+    'breakeropen': '%s %s -> disjoncteur ouvert après %s échec(s) consécutif(s), nouvel essai dans %s s',
+    'breakerclose': '%s %s -> disjoncteur refermé',
     'commandsuccess': '%s %s -> service %s -> succès de l\'envoi de la commande %s',
     'responsefailure': '%s %s -> service %s -> échec du traitement de la réponse à la commande %s',
     'responsesuccess': '%s %s -> service %s -> succès de la réception de la réponse à la commande %s',
     'advertalreadyactivated': 'Écoute des publicités de %s déjà activée',
     'advertstart': 'Démarrage de l\'écoute des publicités de %s',
     'advertstop': 'Fin de l\'écoute des publicités de %s',
+    'livenessalreadyactivated': 'Suivi de la durée de validité des publicités de %s déjà activé',
+    'livenessstart': 'Démarrage du suivi de la durée de validité des publicités de %s',
+    'livenessstop': 'Fin du suivi de la durée de validité des publicités de %s',
+    'renewalalreadyactivated': 'Renouvellement automatique des souscriptions aux serveurs d\'événements déjà activé',
+    'renewalstart': 'Démarrage du renouvellement automatique des souscriptions aux serveurs d\'événements',
+    'renewalstop': 'Fin du renouvellement automatique des souscriptions aux serveurs d\'événements',
+    'expired': '%s %s -> expiration de la durée de validité de %s s de la dernière publicité',
     'subscralreadyactivated': 'Renderer %s -> service %s -> souscription au serveur d\'événements déjà en place',
     'subscrfailure': 'Renderer %s -> service %s -> échec de la demande de souscription au serveur d\'événements',
     'subscrsuccess': 'Renderer %s -> service %s -> souscription au serveur d\'événements sous le SID %s pour une durée de %s',
     'subscrrenewfailure': 'Renderer %s -> service %s -> échec de la demande de renouvellement de souscription de SID %s au serveur d\'événements',
     'subscrrenewsuccess': 'Renderer %s -> service %s -> renouvellement de la souscription de SID %s au serveur d\'événements pour une durée de %s',
     'subscrunsubscrfailure': 'Renderer %s -> service %s -> échec de la demande de fin de souscription de SID %s au serveur d\'événements',
-    'subscrunsubscrsuccess': 'Renderer %s -> service %s -> fin de la souscription de SID %s au serveur d\'événements'
+    'subscrunsubscrsuccess': 'Renderer %s -> service %s -> fin de la souscription de SID %s au serveur d\'événements',
+    'subscrresubscrfailure': 'Renderer %s -> service %s -> échec de la nouvelle souscription en remplacement du SID %s au serveur d\'événements',
+    'subscrresubscrsuccess': 'Renderer %s -> service %s -> nouvelle souscription au serveur d\'événements sous le SID %s en remplacement du SID %s pour une durée de %s'
   },
   'websocket': {
     'endacksuccess': 'WebSocket serveur %s:%s/%s -> WebSocket %s:%s -> succès de l\'envoi de l\'accusé de réception de l\'avis de fin de connexion',
@@ -297,11 +318,13 @@ EN_STRINGS = {
     'alreadyactivated': 'Server of listening of event notifications from DLNA %s at the address %s:%s already activated',
     'receipt': 'DLNA Renderer %s -> service %s -> receipt of the notification of event %s',
     'notification': 'DLNA Renderer %s -> Service %s -> notification of event %s -> %s is changed to %s',
-    'alert': 'DLNA Renderer %s -> Service %s -> notification of event %s -> alerte: %s is changed to %s'
+    'alert': 'DLNA Renderer %s -> Service %s -> notification of event %s -> alerte: %s is changed to %s',
+    'dropped': 'Event notification received from %s:%s rejected due to the saturation of the processing queue'
   },
   'dlnaadvertisement': {
     'receipt': 'Receipt, on the interface %s, of an advertisement from the device %s (%s:%s): %s',
     'ignored': 'Advertisement of the device %s (%s:%s) ignored due to the mismatch of the address of the description URL',
+    'dropped': 'Advertisement received on the interface %s from %s:%s dropped due to the saturation of the processing queue',
     'set': 'Installation of the listening of advertisements of DLNA devices on the interface %s',
     'fail': 'Failure of the installation of the listening of advertisements of DLNA devices on the interface %s',
     'alreadyactivated': 'Listening of advertisements of DLNA devices already activated',
@@ -311,6 +334,7 @@ EN_STRINGS = {
   'dlnahandler': {
     'ip_failure': 'Failure of the retrieval of the host ip address',
     'registering': 'Registration of the %s %s on the interface %s',
+    'cachehit': '%s %s -> description retrieved from the cache',
     'msearch1': 'Sending of a search message of uuid:%s',
     'msearch2': 'Sending of a search message of DLNA device',
     'msearch3': 'Sending of a search message of DNLA %s',
@@ -323,20 +347,34 @@ EN_STRINGS = {
     'stop': 'End of the search of DLNA %s',
     'commandabandonment': '%s %s -> service %s -> abandonment of the sending of the command %s',
     'commandsending': '%s %s -> service %s -> sending of the command %s',
+    'commandcoalesced': '%s %s -> service %s -> pending command %s superseded by the most recent one',
     'commandfailure': '%s %s -> service %s -> failure of the sending of the command %s',
+    'commandrejected': '%s %s -> service %s -> command %s rejected: circuit breaker open',
+    'commandfault': '%s %s -> service %s -> SOAP fault in response to the command %s: %s %s',
+    'breakeropen': '%s %s -> circuit breaker opened after %s consecutive failure(s), next attempt in %s s',
+    'breakerclose': '%s %s -> circuit breaker closed',
     'commandsuccess': '%s %s -> service %s -> success of the sending of the command %s',
     'responsefailure': '%s %s -> service %s -> failure of the processing of the response to the command %s',
     'responsesuccess': '%s %s -> service %s -> success of the receipt of the response to the command %s',
     'advertalreadyactivated': 'Listening of the advertisements of %s already activated',
     'advertstart': 'Start of the listening of advertisements of %s',
     'advertstop': 'End of the listening of advertisements of %s',
+    'livenessalreadyactivated': 'Tracking of the validity period of the advertisements of %s already activated',
+    'livenessstart': 'Start of the tracking of the validity period of the advertisements of %s',
+    'livenessstop': 'End of the tracking of the validity period of the advertisements of %s',
+    'renewalalreadyactivated': 'Automatic renewal of the subscriptions to the events servers already activated',
+    'renewalstart': 'Start of the automatic renewal of the subscriptions to the events servers',
+    'renewalstop': 'End of the automatic renewal of the subscriptions to the events servers',
+    'expired': '%s %s -> expiry of the validity period of %s s of the last advertisement',
     'subscralreadyactivated': 'Renderer %s -> service %s -> subscription to the events server already in place',
     'subscrfailure': 'Renderer %s -> service %s -> failure of the request of subscription to the events server',
     'subscrsuccess': 'Renderer %s -> service %s -> subscription to the events server under the SID %s for a period of %s',
     'subscrrenewfailure': 'Renderer %s -> service %s -> failure of the request of renewal of subscription under SID %s to the events server',
     'subscrrenewsuccess': 'Renderer %s -> service %s -> renewal of the subscription under SID %s to the events server for a period of %s',
     'subscrunsubscrfailure': 'Renderer %s -> service %s -> failure of the request of end of subscription under SID %s to the events server',
-    'subscrunsubscrsuccess': 'Renderer %s -> service %s -> end of subscription under SID %s to the events server'
+    'subscrunsubscrsuccess': 'Renderer %s -> service %s -> end of subscription under SID %s to the events server',
+    'subscrresubscrfailure': 'Renderer %s -> service %s -> failure of the new subscription replacing SID %s to the events server',
+    'subscrresubscrsuccess': 'Renderer %s -> service %s -> new subscription to the events server under the SID %s replacing SID %s for a period of %s'
   },
   'websocket': {
     'endacksuccess': 'WebSocket server %s:%s/%s -> WebSocket %s:%s -> success of the sending of the acknowledgment of receipt of the notice of end of connection',
@@ -480,7 +518,7 @@ class DLNAEventWarning:
     self.EventListener = event_listener
     self.WatchedProperty = prop_name
     self.WarningEvent = WarningEvent
-    self.WatchedValues = warn_values or None
+    self.WatchedValues = frozenset(warn_values) or None
     self.Triggered = None
     self.TriggerSEQ = None
     self.TriggerLastValue = None
@@ -492,19 +530,23 @@ class DLNAEventWarning:
       self.TriggerSEQ = self.EventListener.CurrentSEQ
       self.Triggered = None
 
+  def watches(self, prop_nvalue):
+    return self.WatchedValues is None or prop_nvalue in self.WatchedValues
+
+  def trigger(self, seq, prop_nvalue):
+    with self.lock:
+      if self.TriggerSEQ is not None and self.TriggerSEQ >= seq:
+        return False
+      self.TriggerLastValue = prop_nvalue
+      self.TriggerSEQ = seq
+      self.Triggered = True
+      if self.WarningEvent is not None:
+        self.WarningEvent.set()
+      return True
+
   def submit(self, seq, prop_name, prop_nvalue):
-    if prop_name == self.WatchedProperty:
-      with self.lock:
-        warn_update = True if (self.TriggerSEQ is None) else (self.TriggerSEQ < seq)
-        if warn_update and self.WatchedValues:
-          warn_update = prop_nvalue in self.WatchedValues
-        if warn_update:
-          self.TriggerLastValue = prop_nvalue
-          self.TriggerSEQ = seq
-          self.Triggered = True
-          if self.WarningEvent is not None:
-            self.WarningEvent.set()
-          return True
+    if prop_name == self.WatchedProperty and self.watches(prop_nvalue):
+      return self.trigger(seq, prop_nvalue)
     return False
 
   def fresh(self):
@@ -518,7 +560,163 @@ class DLNAEventWarning:
     return self.TriggerLastValue
 
 
+class _XMLElement:
+
+  __slots__ = ('namespaceURI', 'localName', 'attributes', 'children', 'text')
+
+  def __init__(self, namespace, name, attributes):
+    self.namespaceURI = namespace
+    self.localName = name
+    self.attributes = attributes
+    self.children = []
+    self.text = []
+
+  def getAttribute(self, name):
+    return self.attributes.get(name, '')
+
+  def getElementsByTagNameNS(self, namespace, name):
+    elements = []
+    stack = self.children[::-1]
+    while stack:
+      element = stack.pop()
+      if (name == '*' or element.localName == name) and (namespace == '*' or element.namespaceURI == namespace):
+        elements.append(element)
+      stack.extend(element.children[::-1])
+    return elements
+
+
+class _XMLStop(Exception):
+  pass
+
+
+def _XMLParser(start, end, data):
+  parser = expat.ParserCreate(namespace_separator=' ')
+  parser.namespace_prefixes = True
+  parser.buffer_text = True
+  parser.StartElementHandler = start
+  parser.EndElementHandler = end
+  parser.CharacterDataHandler = data
+  def _cdata_start():
+    parser.CharacterDataHandler = None
+  def _cdata_end():
+    parser.CharacterDataHandler = data
+  parser.StartCdataSectionHandler = _cdata_start
+  parser.EndCdataSectionHandler = _cdata_end
+  return parser
+
+def _XMLSplitName(name):
+  name = name.split(' ')
+  if len(name) == 1:
+    return None, name[0], name[0]
+  elif len(name) == 2:
+    return name[0], name[1], name[1]
+  else:
+    return name[0], name[1], name[2] + ':' + name[1]
+
+def _XMLParse(xml):
+  document = _XMLElement(None, None, {})
+  stack = [document]
+  def _start(name, attributes):
+    namespace, name, qname = _XMLSplitName(name)
+    element = _XMLElement(namespace, name, attributes)
+    stack[-1].children.append(element)
+    stack.append(element)
+  def _end(name):
+    stack.pop()
+  def _data(data):
+    stack[-1].text.append(data)
+  _XMLParser(_start, _end, _data).Parse(xml, True)
+  return document
+
+def _XMLExtractSOAPResponse(xml, names):
+  texts = {}
+  names = set(names)
+  fault = {}
+  fault_depth = [0]
+  stack = [None]
+  def _start(name, attributes):
+    local_name, qname = _XMLSplitName(name)[1:]
+    if fault_depth[0]:
+      fault_depth[0] += 1
+      if local_name in ('faultcode', 'faultstring', 'errorCode', 'errorDescription') and not local_name in fault:
+        fault[local_name] = None
+        stack.append((fault, local_name, []))
+        return
+    elif local_name == 'Fault':
+      fault_depth[0] = 1
+    elif qname in names and not qname in texts:
+      texts[qname] = None
+      stack.append((texts, qname, []))
+      return
+    stack.append(None)
+  def _end(name):
+    text = stack.pop()
+    if text is not None:
+      text[0][text[1]] = ''.join(text[2])
+    if fault_depth[0]:
+      fault_depth[0] -= 1
+      if not fault_depth[0]:
+        raise _XMLStop()
+    elif text is not None and len(texts) == len(names) and all(t is not None for t in texts.values()):
+      raise _XMLStop()
+  def _data(data):
+    if stack[-1] is not None:
+      stack[-1][2].append(data)
+  try:
+    _XMLParser(_start, _end, _data).Parse(xml, True)
+  except _XMLStop:
+    pass
+  if fault_depth[0] or fault:
+    return texts, fault
+  return texts, None
+
+def _XMLExtractProperties(xml):
+  properties = []
+  depth = [0, False]
+  text = []
+  def _start(name, attributes):
+    depth[0] += 1
+    if depth[0] == 2:
+      depth[1] = _XMLSplitName(name)[1].lower() == 'property'
+    elif depth[0] == 3 and depth[1]:
+      properties.append([_XMLSplitName(name)[1], None])
+      text.clear()
+  def _end(name):
+    if depth[0] == 3 and depth[1]:
+      properties[-1][1] = ''.join(text)
+    depth[0] -= 1
+  def _data(data):
+    if depth[0] == 3 and depth[1]:
+      text.append(data)
+  _XMLParser(_start, _end, _data).Parse(xml, True)
+  return [tuple(prop) for prop in properties]
+
+def _XMLExtractLastChange(xml, channels=None):
+  changes = []
+  depth = [0, False]
+  def _start(name, attributes):
+    depth[0] += 1
+    if depth[0] == 2:
+      depth[1] = True
+    elif depth[0] == 3 and depth[1]:
+      value = next((v for k, v in attributes.items() if k.lower() == 'val'), None)
+      if value is not None:
+        changes.append((_XMLSplitName(name)[1], value))
+        if channels is not None:
+          channels.append(next((v for k, v in attributes.items() if k.lower() == 'channel'), None))
+  def _end(name):
+    depth[0] -= 1
+    if depth[0] == 1 and depth[1]:
+      raise _XMLStop()
+  try:
+    _XMLParser(_start, _end, None).Parse(xml, True)
+  except _XMLStop:
+    pass
+  return changes
+
 def _XMLGetNodeText(node):
+  if isinstance(node, _XMLElement):
+    return ''.join(node.text)
   text = []
   for childNode in node.childNodes:
     if childNode.nodeType == node.TEXT_NODE:
@@ -537,6 +735,137 @@ def _XMLGetRTagText(node, tag):
 def _XMLGetSTagText(node, tag):
   return _XMLGetNodeText(_XMLGetSTagElements(node, tag)[0])
 
+def _SSDPGetMaxAge(msg):
+  try:
+    return int(next(d.split('=', 1)[1] for d in msg.header('CACHE-CONTROL', '').replace(' ', '').split(',') if d[:8].lower() == 'max-age='))
+  except:
+    return None
+
+def _SSDPGetInfo(msg):
+  usn = msg.header('USN', '')
+  return {
+    'udn': (usn[0:6] + usn[6:].split(':', 1)[0]) if usn else None,
+    'bootid': msg.header('BOOTID.UPNP.ORG'),
+    'configid': msg.header('CONFIGID.UPNP.ORG'),
+    'max_age': _SSDPGetMaxAge(msg)
+  }
+
+
+class DLNADescriptionCache:
+
+  def __init__(self, path, max_age=604800):
+    self.path = path
+    self.max_age = max_age
+    self.Hits = 0
+    self.Misses = 0
+    self.Invalidations = 0
+    self.entries = {}
+    self.lock = threading.RLock()
+    try:
+      os.makedirs(path, exist_ok=True)
+    except:
+      pass
+
+  def _file(self, udn):
+    return os.path.join(self.path, hashlib.sha1(udn.encode('utf-8')).hexdigest() + '.json')
+
+  def _load(self, udn):
+    entry = self.entries.get(udn)
+    if entry is None:
+      try:
+        with open(self._file(udn), 'rt', encoding='utf-8') as f:
+          entry = json.load(f)
+        if entry.get('udn') != udn:
+          raise
+        self.entries[udn] = entry
+      except:
+        entry = None
+    return entry
+
+  def _store(self, udn, entry):
+    self.entries[udn] = entry
+    try:
+      fname = self._file(udn)
+      with open(fname + '.tmp', 'wt', encoding='utf-8') as f:
+        json.dump(entry, f)
+      os.replace(fname + '.tmp', fname)
+    except:
+      pass
+
+  def _discard(self, udn):
+    self.entries.pop(udn, None)
+    try:
+      os.remove(self._file(udn))
+    except:
+      pass
+
+  def get(self, udn, desc_url, bootid=None, configid=None):
+    with self.lock:
+      entry = self._load(udn) if udn else None
+      if entry is not None:
+        valid = entry['desc_url'] == desc_url
+        if valid and (bootid is not None or entry['bootid'] is not None):
+          valid = entry['bootid'] == bootid
+        if valid and (configid is not None or entry['configid'] is not None):
+          valid = entry['configid'] == configid
+        if valid and bootid is None and configid is None:
+          valid = time.time() - entry['time'] <= self.max_age
+        if not valid:
+          self._discard(udn)
+          self.Invalidations += 1
+          entry = None
+      if entry is None:
+        self.Misses += 1
+        return None
+      self.Hits += 1
+      return entry
+
+  def put(self, udn, desc_url, bootid, configid, description, scpds=None):
+    with self.lock:
+      entry = {
+        'udn': udn,
+        'desc_url': desc_url,
+        'bootid': bootid,
+        'configid': configid,
+        'time': time.time(),
+        'description': description.decode('ISO-8859-1'),
+        'scpds': {url: body.decode('ISO-8859-1') for url, body in (scpds or {}).items()}
+      }
+      self._store(udn, entry)
+
+  def put_scpd(self, udn, url, body):
+    with self.lock:
+      entry = self._load(udn)
+      if entry is not None:
+        entry['scpds'][url] = body.decode('ISO-8859-1')
+        self._store(udn, entry)
+
+  @staticmethod
+  def description(entry):
+    return entry['description'].encode('ISO-8859-1')
+
+  def get_scpd(self, udn, url):
+    with self.lock:
+      entry = self._load(udn)
+      body = None if entry is None else entry['scpds'].get(url)
+    return None if body is None else body.encode('ISO-8859-1')
+
+  def invalidate(self, udn=None):
+    with self.lock:
+      if udn is not None:
+        if self._load(udn) is not None:
+          self._discard(udn)
+          self.Invalidations += 1
+        return
+      for fname in os.listdir(self.path):
+        if fname.endswith('.json'):
+          try:
+            os.remove(os.path.join(self.path, fname))
+            self.Invalidations += 1
+          except:
+            pass
+      self.entries.clear()
+
 
 class DLNADevice:
 
@@ -554,10 +883,20 @@ class DLNADevice:
     self.SerialNumber = None
     self.UDN = None
     self.IconURL = None
+    self.Hip = None
     self.Services = []
+    self.ServicesIndex = {}
     self.StatusAlive = None
     self.StatusTime = None
     self.StatusAliveLastTime = None
+    self.MaxAge = None
+    self.CommandQueue = None
+    self.StateCache = None
+    self.PositionTracker = None
+    self.LatencyStats = {}
+    self.CircuitBreaker = None
+    self.LastSOAPFault = None
+    self.ExpiryTime = None
 
 class DLNAService:
 
@@ -567,14 +906,73 @@ class DLNAService:
     self.ControlURL = None
     self.SubscrEventURL = None
     self.DescURL = None
-    self.Actions = []
-    self.EventThroughLastChange = None
+    self.loader = None
+    self.lock = threading.Lock()
+    self._Actions = []
+    self._ActionsIndex = {}
+    self._StateVariables = {}
+    self._EventThroughLastChange = None
+
+  def load(self):
+    if self.loader is not None:
+      with self.lock:
+        if self.loader is not None:
+          if self.loader(self):
+            self.loader = None
+    return self.loader is None
+
+  @property
+  def Loaded(self):
+    return self.loader is None
+
+  @property
+  def Actions(self):
+    if self.loader is not None:
+      self.load()
+    return self._Actions
+
+  @Actions.setter
+  def Actions(self, value):
+    self._Actions = value
+
+  @property
+  def ActionsIndex(self):
+    if self.loader is not None:
+      self.load()
+    return self._ActionsIndex
+
+  @ActionsIndex.setter
+  def ActionsIndex(self, value):
+    self._ActionsIndex = value
+
+  @property
+  def StateVariables(self):
+    if self.loader is not None:
+      self.load()
+    return self._StateVariables
+
+  @StateVariables.setter
+  def StateVariables(self, value):
+    self._StateVariables = value
+
+  @property
+  def EventThroughLastChange(self):
+    if self.loader is not None:
+      self.load()
+    return self._EventThroughLastChange
+
+  @EventThroughLastChange.setter
+  def EventThroughLastChange(self, value):
+    self._EventThroughLastChange = value
 
 class DLNAAction:
 
   def __init__(self):
     self.Name = None
     self.Arguments = []
+    self.InArguments = ()
+    self.OutArguments = ()
+    self.Template = None
 
 class DLNAArgument:
 
@@ -586,6 +984,162 @@ class DLNAArgument:
     self.AllowedValueList = None
     self.AllowedValueRange = None
     self.DefaultValue = None
+    self.StateVariable = None
+
+class DLNASOAPTemplate:
+
+  def __init__(self, service_name, action):
+    self.Prefix = (
+      '<?xml version="1.0"?>\n'
+      '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">\n'
+      '<s:Body>\n'
+      '<u:%s xmlns:u="urn:schemas-upnp-org:service:%s:1">\n' % (action.Name, service_name)
+    ).encode('utf-8')
+    self.Suffix = (
+      '</u:%s>\n'
+      '</s:Body>\n'
+      '</s:Envelope>' % action.Name
+    ).encode('utf-8')
+    self.Slots = tuple((arg.Name, ('<%s>' % arg.Name).encode('utf-8'), ('</%s>\n' % arg.Name).encode('utf-8'), arg.DefaultValue or None, arg.StateVariable) for arg in action.InArguments)
+    self.Names = frozenset(slot[0] for slot in self.Slots)
+    self.Headers = {
+      'User-Agent': 'PlayOn DLNA Controller',
+      'Content-Type': 'text/xml; charset="utf-8"',
+      'SOAPAction': '"urn:schemas-upnp-org:service:%s:1#%s"' % (service_name, action.Name)
+    }
+    self.OutArguments = tuple(arg.Name for arg in action.OutArguments)
+
+  @staticmethod
+  def _allowed(statevar, value):
+    if statevar is None:
+      return True
+    if statevar.AllowedValues is not None and str(value) not in statevar.AllowedValues:
+      return False
+    if statevar.AllowedRange is not None:
+      try:
+        value = DLNAHandler._parse_number(str(value))
+      except:
+        return False
+      vmin, vmax, step = statevar.AllowedRange
+      if value < vmin or value > vmax:
+        return False
+      if step and (value - vmin) % step:
+        return False
+    return True
+
+  def build(self, arguments, check_allowed=False):
+    if self.Slots and not arguments:
+      return None
+    if not self.Names.issuperset(arguments):
+      return None
+    parts = [self.Prefix]
+    for name, start, end, default, statevar in self.Slots:
+      if name in arguments:
+        value = arguments[name]
+      elif default is not None:
+        value = default
+      else:
+        return None
+      if check_allowed and not self._allowed(statevar, value):
+        return None
+      parts.append(start)
+      parts.append(html.escape(str(value)).encode('utf-8'))
+      parts.append(end)
+    parts.append(self.Suffix)
+    return b''.join(parts)
+
+
+class DLNASOAPFault:
+
+  __slots__ = ('Service', 'Action', 'ErrorCode', 'ErrorDescription', 'FaultCode', 'FaultString', 'Time')
+
+  def __init__(self, service, action, fault):
+    self.Service = service
+    self.Action = action
+    try:
+      self.ErrorCode = int(fault.get('errorCode'))
+    except:
+      self.ErrorCode = None
+    self.ErrorDescription = fault.get('errorDescription')
+    self.FaultCode = fault.get('faultcode')
+    self.FaultString = fault.get('faultstring')
+    self.Time = time.localtime()
+
+  def __repr__(self):
+    return '<DLNASOAPFault %s#%s: %s %s>' % (self.Service, self.Action, self.ErrorCode, self.ErrorDescription)
+
+
+class DLNAStateVariable:
+
+  def __init__(self):
+    self.Name = None
+    self.Event = None
+    self.Type = None
+    self.AllowedValueList = None
+    self.AllowedValueRange = None
+    self.AllowedValues = None
+    self.AllowedRange = None
+    self.DefaultValue = None
+
+class DLNAEventLog:
+
+  DEFAULT_CAPACITY = 1024
+
+  def __init__(self, capacity=DEFAULT_CAPACITY):
+    self.capacity = max(1, capacity)
+    self.Entries = collections.OrderedDict()
+    self.LastSEQ = None
+    self.Gaps = 0
+    self.Evicted = 0
+    self.lock = threading.Lock()
+
+  def append(self, seq, event):
+    with self.lock:
+      if self.LastSEQ is not None and seq > self.LastSEQ + 1:
+        self.Gaps += seq - self.LastSEQ - 1
+      self.LastSEQ = seq
+      self.Entries.pop(seq, None)
+      self.Entries[seq] = event
+      while len(self.Entries) > self.capacity:
+        self.Entries.popitem(last=False)
+        self.Evicted += 1
+
+  def get(self, seq, default=None):
+    return self.Entries.get(seq, default)
+
+  def clear(self):
+    with self.lock:
+      self.Entries.clear()
+      self.LastSEQ = None
+
+  def range(self, start=None, stop=None):
+    with self.lock:
+      return [(seq, event) for seq, event in self.Entries.items() if (start is None or seq >= start) and (stop is None or seq < stop)]
+
+  def gaps(self):
+    with self.lock:
+      seqs = sorted(self.Entries.keys())
+    return [(a + 1, b - 1) for a, b in zip(seqs, seqs[1:]) if b - a > 1]
+
+  def __getitem__(self, key):
+    if isinstance(key, slice):
+      return [event for seq, event in self.range(key.start, key.stop)][::key.step]
+    if key < 0:
+      with self.lock:
+        events = list(self.Entries.values())
+      return events[key]
+    return self.Entries.get(key)
+
+  def __len__(self):
+    return len(self.Entries)
+
+  def __iter__(self):
+    with self.lock:
+      return iter(list(self.Entries.values()))
+
+  def __bool__(self):
+    return bool(self.Entries)
+
 
 class DLNAEventListener:
 
@@ -597,11 +1151,28 @@ class DLNAEventListener:
     self.hip = None
     self.callback_number = None
     self.log = log
-    self.EventsLog = []
+    self.EventsLog = DLNAEventLog(DLNAEventLog.DEFAULT_CAPACITY if log is True or not log else log)
     self.CurrentSEQ = None
     self.Warnings = []
+    self.WarningsIndex = {}
+    self.warnings_version = 0
+    self.indexed_version = (0, 0)
+    self.RequestedTimeout = None
+    self.Timeout = None
+    self.ExpiryTime = None
+    self.RenewalFailures = 0
     self.is_running = None
 
+  def warnings_index(self):
+    version = (self.warnings_version, len(self.Warnings))
+    if version != self.indexed_version:
+      index = {}
+      for warning in tuple(self.Warnings):
+        index.setdefault(warning.WatchedProperty, []).append(warning)
+      self.WarningsIndex = {prop_name: tuple(w) for prop_name, w in index.items()}
+      self.indexed_version = version
+    return self.WarningsIndex
+
 class DLNAEvent:
 
   def __init__(self):
@@ -616,52 +1187,308 @@ class DLNAServer(DLNADevice):
 
   DEVICE_TYPE = 'Server'
 
-class DLNAEventNotificationServer(socketserver.TCPServer):
+class DLNAEventNotificationConnection:
+
+  __slots__ = ('sock', 'inbuf', 'outbuf', 'busy', 'continued', 'close_after', 'eof', 'last_activity')
+
+  def __init__(self, sock):
+    self.sock = sock
+    self.inbuf = bytearray()
+    self.outbuf = bytearray()
+    self.busy = False
+    self.continued = False
+    self.close_after = False
+    self.eof = False
+    self.last_activity = time.monotonic()
+
 
-  request_queue_size = 100
+class DLNAEventNotificationServer:
 
-  def __init__(self, *args, verbosity, **kwargs):
+  RESPONSE_OK = 'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n'.encode('ISO-8859-1')
+  RESPONSE_OK_CLOSE = 'HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('ISO-8859-1')
+  RESPONSE_BAD_REQUEST = 'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('ISO-8859-1')
+  RESPONSE_PRECONDITION_FAILED = 'HTTP/1.1 412 Precondition Failed\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('ISO-8859-1')
+  RESPONSE_TOO_LARGE = 'HTTP/1.1 413 Payload too large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('ISO-8859-1')
+  RESPONSE_UNAVAILABLE = 'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('ISO-8859-1')
+  RESPONSE_CONTINUE = 'HTTP/1.1 100 Continue\r\n\r\n'.encode('ISO-8859-1')
+
+  def __init__(self, server_address, handler, verbosity, workers=4, queue_size=64, max_connections=256, idle_timeout=30, max_length=1048576):
     self.logger = log_event('dlnanotification', verbosity)
-    super().__init__(*args, **kwargs)
-    self.__dict__['_BaseServer__is_shut_down'].set()
-  
-  def server_bind(self):
+    self.Handler = handler
+    self.Handler.logger = self.logger
+    self.workers = max(1, workers)
+    self.Queues = tuple(queue.Queue(queue_size) for w in range(self.workers))
+    self.Responses = collections.deque()
+    self.Connections = {}
+    self.max_connections = max_connections
+    self.idle_timeout = idle_timeout
+    self.max_length = max_length
+    self.Processed = 0
+    self.Rejected = 0
+    self.__shutdown_request = False
+    self.__is_shut_down = threading.Event()
+    self.__is_shut_down.set()
+    self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+      self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+      self.socket.bind(server_address)
+      self.socket.listen(100)
+      self.socket.setblocking(False)
+      self.wakeup_r, self.wakeup_w = socket.socketpair()
+      self.wakeup_r.setblocking(False)
+      self.wakeup_w.setblocking(False)
+    except:
+      self.socket.close()
+      raise
+
+  def _work(self, q):
+    while True:
+      item = q.get()
+      if item is None:
+        break
+      conn, req = item
+      self.Handler.handle(req, partial(self._respond, conn, not req.expect_close))
+      self.Processed += 1
+
+  def _respond(self, conn, keep_alive, accepted):
+    if accepted is None:
+      self.Responses.append((conn, self.RESPONSE_PRECONDITION_FAILED, True))
+    elif not accepted:
+      self.Responses.append((conn, self.RESPONSE_BAD_REQUEST, True))
+    else:
+      self.Responses.append((conn, self.RESPONSE_OK if keep_alive else self.RESPONSE_OK_CLOSE, not keep_alive))
     try:
-      self.socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+      self.wakeup_w.send(b'\x00')
     except:
       pass
-    super().server_bind()
 
-  def shutdown(self):
-    self.socket.close()
-    super().shutdown()
+  def _frame(self, conn):
+    buf = conn.inbuf
+    while buf[:2] == b'\r\n':
+      del buf[:2]
+    header_end = buf.find(b'\r\n\r\n')
+    if header_end < 0:
+      return False if len(buf) > self.max_length else None
+    header_end += 4
+    req = HTTPExplodedMessage()
+    if not HTTPMessage._read_headers(buf[:header_end].decode('ISO-8859-1'), req):
+      return False
+    if req.in_header('Transfer-Encoding', 'chunked'):
+      body_end = buf.find(b'\n0\r\n\r\n', header_end - 1)
+      if body_end >= 0:
+        body_end += 6
+    else:
+      try:
+        body_end = header_end + max(0, int(req.header('Content-Length', 0)))
+      except:
+        return False
+      if len(buf) < body_end:
+        body_end = -1
+    if body_end < 0:
+      if len(buf) > self.max_length:
+        return False
+      if req.in_header('Expect', '100-continue') and not conn.continued:
+        conn.continued = True
+        conn.outbuf += self.RESPONSE_CONTINUE
+      return None
+    message = bytes(buf[:body_end])
+    del buf[:body_end]
+    conn.continued = False
+    expect_close = req.expect_close
+    req = HTTPMessage([message])
+    if not req:
+      return False
+    req.expect_close = expect_close
+    return req
 
-  def server_close(self):
-    pass
+  def _dispatch(self, selector, conn):
+    if conn.busy or conn.close_after:
+      return
+    req = self._frame(conn)
+    if req is None:
+      if conn.eof:
+        self._close(selector, conn)
+      else:
+        self._update(selector, conn)
+      return
+    if req is False:
+      self._reply(selector, conn, self.RESPONSE_TOO_LARGE if len(conn.inbuf) > self.max_length else self.RESPONSE_BAD_REQUEST, True)
+      return
+    conn.busy = True
+    try:
+      self.Queues[hash(req.path) % self.workers].put_nowait((conn, req))
+    except queue.Full:
+      conn.busy = False
+      self.Rejected += 1
+      self.logger.log(1, 'dropped', *conn.sock.getpeername()[:2])
+      self._reply(selector, conn, self.RESPONSE_UNAVAILABLE, True)
 
-class DLNAEventNotificationHandler(socketserver.BaseRequestHandler):
+  def _reply(self, selector, conn, response, close):
+    conn.busy = False
+    conn.outbuf += response
+    conn.close_after = conn.close_after or close or conn.eof
+    self._write(selector, conn)
 
-  def __init__(self, *args, EventListeners, process_lastchange, **kwargs):
-    self.EventListeners = EventListeners
-    self.process_lastchange = process_lastchange
+  def _update(self, selector, conn):
     try:
-      super().__init__(*args, **kwargs)
+      selector.modify(conn.sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if conn.outbuf else 0), conn)
+    except:
+      pass
+
+  def _close(self, selector, conn):
+    if self.Connections.pop(conn.sock, None) is None:
+      return
+    try:
+      selector.unregister(conn.sock)
     except:
       pass
-  
-  def handle(self):
     try:
-      req = HTTPMessage(self.request)
-      event_listeners = list(self.EventListeners)
+      conn.sock.close()
+    except:
+      pass
+
+  def _write(self, selector, conn):
+    if conn.outbuf:
+      try:
+        del conn.outbuf[:conn.sock.send(conn.outbuf)]
+      except BlockingIOError:
+        pass
+      except:
+        self._close(selector, conn)
+        return
+      conn.last_activity = time.monotonic()
+    if conn.outbuf:
+      self._update(selector, conn)
+    elif conn.close_after:
+      self._close(selector, conn)
+    else:
+      self._dispatch(selector, conn)
+
+  def _read(self, selector, conn):
+    try:
+      data = conn.sock.recv(65536)
+    except BlockingIOError:
+      return
+    except:
+      self._close(selector, conn)
+      return
+    conn.last_activity = time.monotonic()
+    if not data:
+      conn.eof = True
+      if not conn.busy and not conn.outbuf:
+        self._close(selector, conn)
+      else:
+        conn.close_after = True
+      return
+    conn.inbuf += data
+    self._dispatch(selector, conn)
+
+  def _accept(self, selector):
+    while True:
+      try:
+        sock, addr = self.socket.accept()
+      except:
+        return
+      if len(self.Connections) >= self.max_connections:
+        sock.close()
+        continue
+      sock.setblocking(False)
+      conn = self.Connections[sock] = DLNAEventNotificationConnection(sock)
+      selector.register(sock, selectors.EVENT_READ, conn)
+
+  def _sweep(self, selector):
+    now = time.monotonic()
+    for conn in list(self.Connections.values()):
+      if not conn.busy and now - conn.last_activity > self.idle_timeout:
+        self._close(selector, conn)
+
+  def stats(self):
+    return {'processed': self.Processed, 'rejected': self.Rejected, 'connections': len(self.Connections), 'queued': sum(q.qsize() for q in self.Queues)}
+
+  def serve_forever(self):
+    self.__is_shut_down.clear()
+    self.__shutdown_request = False
+    workers = tuple(threading.Thread(target=self._work, args=(q,), daemon=True) for q in self.Queues)
+    for worker in workers:
+      worker.start()
+    with selectors.DefaultSelector() as selector:
+      selector.register(self.socket, selectors.EVENT_READ, None)
+      selector.register(self.wakeup_r, selectors.EVENT_READ, self)
+      last_sweep = time.monotonic()
+      while not self.__shutdown_request:
+        try:
+          ready = selector.select(0.5)
+          if self.__shutdown_request:
+            break
+          for key, events in ready:
+            if key.data is None:
+              self._accept(selector)
+            elif key.data is self:
+              try:
+                while self.wakeup_r.recv(4096):
+                  pass
+              except:
+                pass
+            else:
+              if events & selectors.EVENT_WRITE:
+                self._write(selector, key.data)
+              if events & selectors.EVENT_READ and key.data.sock in self.Connections:
+                self._read(selector, key.data)
+          while self.Responses:
+            conn, response, close = self.Responses.popleft()
+            if conn.sock in self.Connections:
+              self._reply(selector, conn, response, close)
+          if time.monotonic() - last_sweep > 1:
+            last_sweep = time.monotonic()
+            self._sweep(selector)
+        except:
+          pass
+      for conn in list(self.Connections.values()):
+        self._close(selector, conn)
+    for q in self.Queues:
+      q.put(None)
+    for worker in workers:
+      worker.join()
+    self.__shutdown_request = False
+    self.__is_shut_down.set()
+
+  def shutdown(self):
+    self.__shutdown_request = True
+    try:
+      self.wakeup_w.send(b'\x00')
+    except:
+      pass
+    self.__is_shut_down.wait()
+    for sock in (self.socket, self.wakeup_r, self.wakeup_w):
+      try:
+        sock.close()
+      except:
+        pass
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    pass
+
+class DLNAEventNotificationHandler:
+
+  def __init__(self, Listener, process_lastchange):
+    self.Listener = Listener
+    self.process_lastchange = process_lastchange
+    self.logger = None
+
+  def handle(self, req, respond):
+    try:
       if req.method != 'NOTIFY':
         raise
-      callback_number = int(req.path.strip(' /'))
-      EventListener = next(e for e in event_listeners if e.callback_number == callback_number)
-      if req.header('SID', '') != EventListener.SID:
-        raise
+      EventListener = self.Listener.BySID.get((req.header('SID', ''), req.path.strip(' /')))
+      if EventListener is None:
+        respond(None)
+        return
       dlna_event = DLNAEvent()
       seq = req.header('SEQ', '')
-      self.server.logger.log(1, 'receipt', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], seq)
+      self.logger.log(1, 'receipt', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], seq)
       seq = int(seq)
       if EventListener.CurrentSEQ is None:
         EventListener.CurrentSEQ = seq
@@ -669,79 +1496,94 @@ class DLNAEventNotificationHandler(socketserver.BaseRequestHandler):
         EventListener.CurrentSEQ = seq
       if EventListener.log:
         dlna_event.ReceiptTime = time.localtime()
-        if len(EventListener.EventsLog) < seq:
-          EventListener.EventsLog = EventListener.EventsLog + [None]*(seq - len(EventListener.EventsLog))
-      root_xml = minidom.parseString(req.body)
-      try:
-        self.request.sendall("HTTP/1.0 200 OK\r\nContent-Length: 0\r\n\r\n".encode("ISO-8859-1"))
-      except:
-        pass
+      properties = _XMLExtractProperties(req.body)
+      respond(True)
     except:
-      self.request.sendall("HTTP/1.0 400 Bad Request\r\nContent-Length: 0\r\n\r\n".encode("ISO-8859-1"))
+      respond(False)
       return
     try:
-      for node in root_xml.documentElement.childNodes:
-        if node.nodeType != node.ELEMENT_NODE:
-          continue
-        if node.localName.lower() != 'property':
-          continue
-        for child_node in node.childNodes:
+      channels = None if EventListener.Device.StateCache is None else []
+      for prop_name, prop_nvalue in properties:
+        self.logger.log(2, 'notification', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], seq, prop_name, prop_nvalue)
+        if prop_name.upper() == 'LastChange'.upper():
           try:
-            prop_name = child_node.localName
+            dlna_event.Changes.extend(self.process_lastchange(prop_nvalue, channels))
           except:
-            continue
-          try:
-            prop_nvalue = _XMLGetNodeText(child_node)
-          except:
-            continue
-          self.server.logger.log(2, 'notification', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], seq, prop_name, prop_nvalue)
-          if prop_name.upper() == 'LastChange'.upper():
-            try:
-              dlna_event.Changes.extend(self.process_lastchange(prop_nvalue))
-            except:
-              dlna_event.Changes.append((prop_name, prop_nvalue))
-          else:
             dlna_event.Changes.append((prop_name, prop_nvalue))
+        else:
+          dlna_event.Changes.append((prop_name, prop_nvalue))
+        if channels is not None:
+          channels.extend((None,) * (len(dlna_event.Changes) - len(channels)))
       if EventListener.log:
-        EventListener.EventsLog.append(dlna_event)
-      for (prop_name, prop_nvalue) in dlna_event.Changes:
-        for warning in EventListener.Warnings:
-          if warning.submit(seq, prop_name, prop_nvalue):
-            self.server.logger.log(2, 'alert', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], seq, prop_name, prop_nvalue)
+        EventListener.EventsLog.append(seq, dlna_event)
+      if channels is not None:
+        EventListener.Device.StateCache.update_from_event(EventListener, dlna_event.Changes, channels)
+      if EventListener.Device.PositionTracker is not None:
+        EventListener.Device.PositionTracker.update_from_event(dlna_event.Changes)
+      warnings_index = EventListener.warnings_index()
+      if warnings_index:
+        touched = {}
+        for (prop_name, prop_nvalue) in dlna_event.Changes:
+          for warning in warnings_index.get(prop_name, ()):
+            if not warning in touched and warning.watches(prop_nvalue):
+              touched[warning] = prop_nvalue
+        for warning, prop_nvalue in touched.items():
+          if warning.trigger(seq, prop_nvalue):
+            self.logger.log(2, 'alert', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], seq, warning.WatchedProperty, prop_nvalue)
     except:
       return
 
 class DLNAEventNotificationListener:
 
-  def __init__(self, handler, port, private=False):
+  def __init__(self, handler, port, private=False, workers=4):
     self.logger = log_event('dlnanotification', handler.verbosity)
     self.Handler = handler
     self.port = port
     self.private = private
+    self.workers = workers
     self.EventListeners = []
+    self.ByCallback = {}
+    self.BySID = {}
     self.seq = 0
     self.receiver_thread = None
     self.is_running = None
+    self.lock = threading.Lock()
 
   def register(self, eventlistener):
-    if not self.private or not self.seq:
-      self.EventListeners.append(eventlistener)
-      self.seq += 1
-      return self.seq
-    else:
-      return None
+    with self.lock:
+      if not self.private or not self.seq:
+        self.seq += 1
+        self.EventListeners.append(eventlistener)
+        self.ByCallback[self.seq] = eventlistener
+        return self.seq
+      else:
+        return None
 
-  def unregister(self, eventlistener):
-    try:
-      self.EventListeners.remove(eventlistener)
+  def index_sid(self, eventlistener, sid=None):
+    with self.lock:
+      if self.ByCallback.get(eventlistener.callback_number) is not eventlistener:
+        return False
+      if sid is not None and self.BySID.get((sid, str(eventlistener.callback_number))) is eventlistener:
+        del self.BySID[(sid, str(eventlistener.callback_number))]
+      if eventlistener.SID:
+        self.BySID[(eventlistener.SID, str(eventlistener.callback_number))] = eventlistener
       return True
-    except:
-      return False
+
+  def unregister(self, eventlistener):
+    with self.lock:
+      if self.ByCallback.get(eventlistener.callback_number) is eventlistener:
+        del self.ByCallback[eventlistener.callback_number]
+      if eventlistener.SID and self.BySID.get((eventlistener.SID, str(eventlistener.callback_number))) is eventlistener:
+        del self.BySID[(eventlistener.SID, str(eventlistener.callback_number))]
+      try:
+        self.EventListeners.remove(eventlistener)
+        return True
+      except:
+        return False
 
   def _start_event_notification_receiver(self, server_ready):
-    DLNAEventNotificationBoundHandler = partial(DLNAEventNotificationHandler, process_lastchange=self.Handler._process_lastchange, EventListeners=self.EventListeners)
     try:
-      with DLNAEventNotificationServer((self.Handler.ip, self.port), DLNAEventNotificationBoundHandler, verbosity=self.Handler.verbosity) as self.DLNAEventNotificationReceiver:
+      with DLNAEventNotificationServer((self.Handler.ip, self.port), DLNAEventNotificationHandler(self, self.Handler._process_lastchange), verbosity=self.Handler.verbosity, workers=self.workers) as self.DLNAEventNotificationReceiver:
         server_ready.set()
         self.DLNAEventNotificationReceiver.serve_forever()
     except:
@@ -775,7 +1617,7 @@ class DLNAEventNotificationListener:
 
 class DLNAAdvertisementServer:
 
-  def __init__(self, handlers, verbosity):
+  def __init__(self, handlers, verbosity, workers=4, queue_size=256):
     self.logger = log_event('dlnaadvertisement', verbosity)
     self.Handlers = handlers
     self.__shutdown_request = False
@@ -783,14 +1625,62 @@ class DLNAAdvertisementServer:
     self.__is_shut_down.set()
     self.Sockets = ()
     self.Ips = ()
+    self.workers = workers
+    self.Queue = queue.Queue(queue_size)
+    self.LastSeen = {}
+    self.last_sweep = time.monotonic()
+    self.Processed = 0
+    self.Deduplicated = 0
+    self.Dropped = 0
+    self.lock = threading.Lock()
+
+  def _refresh(self, req):
+    usn = req.header('USN', '')
+    nts = req.header('NTS', '').lower()
+    if 'byebye' in nts:
+      with self.lock:
+        self.LastSeen.pop(usn, None)
+      return False
+    if not 'alive' in nts:
+      return False
+    now = time.monotonic()
+    with self.lock:
+      seen = self.LastSeen.get(usn)
+      if seen is not None and seen[2] <= now:
+        del self.LastSeen[usn]
+        seen = None
+    if seen is None or seen[0] != req.header('Location', '') or not all(dev.StatusAlive for handler, dev in seen[1]):
+      return False
+    time_req = time.localtime()
+    max_age = _SSDPGetMaxAge(req)
+    for handler, dev in seen[1]:
+      handler._device_alive(dev, time_req, max_age)
+    with self.lock:
+      if self.LastSeen.get(usn) is seen:
+        self.LastSeen[usn] = (seen[0], seen[1], now + (max_age or 1800))
+    return True
 
-  def _handle(self, i, msg, addr):
-    sock = self.Sockets[i]
+  def _sweep(self):
+    now = time.monotonic()
+    with self.lock:
+      if now - self.last_sweep < 60:
+        return
+      self.last_sweep = now
+      for usn in [usn for usn, seen in self.LastSeen.items() if seen[2] <= now]:
+        del self.LastSeen[usn]
+
+  def _work(self):
+    while True:
+      item = self.Queue.get()
+      if item is None:
+        break
+      self._handle(*item)
+      with self.lock:
+        self.Processed += 1
+
+  def _handle(self, i, req, addr):
     ip = self.Ips[i]
     try:
-      req = HTTPMessage((msg, sock))
-      if req.method != 'NOTIFY':
-        return
       nt = req.header('NT', '')
       only_media = True
       for handler in self.Handlers:
@@ -813,34 +1703,54 @@ class DLNAAdvertisementServer:
           if not ('Media' + handler.DEVICE_TYPE).lower() in nt.lower():
             continue
         if 'alive' in nts.lower():
-          for dev in handler.Devices:
-            if dev.DescURL == desc_url and dev.UDN == udn:
-              if dev.StatusAlive:
-                if dev.StatusTime < time_req:
-                  dev.StatusTime = time_req
-                  dev.StatusAliveLastTime = time_req
-              else:
-                handler._update_devices(desc_url, time_req, ip, handler.advert_status_change)
-              break
+          dev = handler.Registry.get(desc_url, udn)
+          if dev is not None:
+            if dev.StatusAlive:
+              handler._device_alive(dev, time_req, _SSDPGetMaxAge(req))
+            else:
+              handler._update_devices(desc_url, time_req, ip, handler.advert_status_change, ssdp=_SSDPGetInfo(req))
           else:
             if dip == addr[0]:
-              handler._update_devices(desc_url, time_req, ip, handler.advert_status_change)
+              handler._update_devices(desc_url, time_req, ip, handler.advert_status_change, ssdp=_SSDPGetInfo(req))
             else:
               self.logger.log(2, 'ignored', usn, *addr)
         elif 'byebye' in nts.lower():
-          for dev in handler.Devices:
-            if dev.DescURL == desc_url and dev.UDN == udn:
-              if dev.StatusAlive:
-                dev.StatusAlive = False
-                handler.advert_status_change.set()
-              dev.StatusTime = time_req
-              break
+          dev = handler.Registry.get(desc_url, udn)
+          if dev is not None:
+            if dev.StatusAlive:
+              dev.StatusAlive = False
+              handler.advert_status_change.set()
+            dev.StatusTime = time_req
+      if 'alive' in nts.lower():
+        seen = tuple((handler, dev) for handler in self.Handlers for dev in (handler.Registry.get(desc_url, udn),) if dev is not None and dev.StatusAlive)
+        if seen:
+          with self.lock:
+            self.LastSeen[usn] = (desc_url, seen, time.monotonic() + (_SSDPGetMaxAge(req) or 1800))
     except:
       return
 
   def handle(self, i, msg, addr):
-    t = threading.Thread(target=self._handle, args=(i, msg, addr), daemon=True)
-    t.start()
+    try:
+      req = HTTPMessage((msg, self.Sockets[i]))
+      if req.method != 'NOTIFY':
+        return
+      self._sweep()
+      if self._refresh(req):
+        with self.lock:
+          self.Deduplicated += 1
+        return
+    except:
+      return
+    try:
+      self.Queue.put_nowait((i, req, addr))
+    except queue.Full:
+      with self.lock:
+        self.Dropped += 1
+      self.logger.log(2, 'dropped', self.Ips[i], *addr)
+
+  def stats(self):
+    with self.lock:
+      return {'processed': self.Processed, 'deduplicated': self.Deduplicated, 'dropped': self.Dropped, 'queued': self.Queue.qsize(), 'tracked': len(self.LastSeen)}
 
   def serve_forever(self):
     self.__is_shut_down.clear()
@@ -863,6 +1773,9 @@ class DLNAAdvertisementServer:
           self.logger.log(1, 'fail', ip)
       if not can_run:
         self.__shutdown_request = True
+      workers = tuple(threading.Thread(target=self._work, daemon=True) for w in range(self.workers if can_run else 0))
+      for worker in workers:
+        worker.start()
       while not self.__shutdown_request:
         try:
           ready = selector.select(0.5)
@@ -875,6 +1788,10 @@ class DLNAAdvertisementServer:
               pass
         except:
           pass
+      for worker in workers:
+        self.Queue.put(None)
+      for worker in workers:
+        worker.join()
     self.__shutdown_request = False
     self.__is_shut_down.set()
 
@@ -895,16 +1812,19 @@ class DLNAAdvertisementServer:
 
 class DLNAAdvertisementListener:
 
-  def __init__(self, handlers=[], verbosity=0):
+  def __init__(self, handlers=[], verbosity=0, workers=4, queue_size=256):
     self.DLNAHandlers = handlers
     for handler in handlers:
       handler.advertisement_listener = self
     self.is_advert_receiver_running = None
     self.verbosity = verbosity
+    self.workers = workers
+    self.queue_size = queue_size
+    self.DLNAAdvertisementReceiver = None
     self.logger = log_event('dlnaadvertisement', verbosity)
 
   def _start_advertisement_receiver(self):
-    with DLNAAdvertisementServer(self.DLNAHandlers, self.verbosity) as self.DLNAAdvertisementReceiver:
+    with DLNAAdvertisementServer(self.DLNAHandlers, self.verbosity, self.workers, self.queue_size) as self.DLNAAdvertisementReceiver:
       self.DLNAAdvertisementReceiver.serve_forever()
     self.is_advert_receiver_running = None
     for handler in self.DLNAHandlers:
@@ -925,31 +1845,705 @@ class DLNAAdvertisementListener:
       self.logger.log(1, 'alreadyactivated')
       return False
     else:
-      self.is_advert_receiver_running = True
-      for handler in self.DLNAHandlers:
-        handler.is_advert_receiver_running = True
-      self.logger.log(1, 'start')
-      for handler in self.DLNAHandlers:
-        if not isinstance(handler.advert_status_change, threading.Event):
-          handler.advert_status_change = threading.Event()
-      receiver_thread = threading.Thread(target=self._start_advertisement_receiver)
-      receiver_thread.start()
-      return True
-  
-  def stop(self):
-    if self.is_advert_receiver_running:
-      self.logger.log(1, 'stop')
-      self._shutdown_advertisement_receiver()
+      self.is_advert_receiver_running = True
+      for handler in self.DLNAHandlers:
+        handler.is_advert_receiver_running = True
+      self.logger.log(1, 'start')
+      for handler in self.DLNAHandlers:
+        if not isinstance(handler.advert_status_change, threading.Event):
+          handler.advert_status_change = threading.Event()
+      receiver_thread = threading.Thread(target=self._start_advertisement_receiver)
+      receiver_thread.start()
+      return True
+  
+  def stop(self):
+    if self.is_advert_receiver_running:
+      self.logger.log(1, 'stop')
+      self._shutdown_advertisement_receiver()
+
+  def stats(self):
+    try:
+      return self.DLNAAdvertisementReceiver.stats()
+    except:
+      return None
+
+  def wait(self, handler, timeout=None):
+    adv_event = None
+    try:
+      adv_event = handler.advert_status_change.wait(timeout)
+    except:
+      pass
+    if adv_event:
+      handler.advert_status_change.clear()
+    return adv_event
+
+
+class DLNALivenessMonitor:
+
+  def __init__(self, handler, LivenessEvent=None):
+    self.Handler = handler
+    self.LivenessEvent = LivenessEvent
+    self.Heap = []
+    self.Scheduled = set()
+    self.Expired = 0
+    self.condition = threading.Condition()
+    self.seq = 0
+    self.monitor_thread = None
+    self.is_running = None
+
+  def schedule(self, dev):
+    with self.condition:
+      if not self.is_running or dev in self.Scheduled:
+        return
+      self.Scheduled.add(dev)
+      self.seq += 1
+      heapq.heappush(self.Heap, (dev.ExpiryTime, self.seq, dev))
+      if self.Heap[0][2] is dev:
+        self.condition.notify()
+
+  def _expire(self, dev):
+    with self.Handler.update_devices:
+      if not dev.StatusAlive or dev.ExpiryTime is None or dev.ExpiryTime > time.monotonic():
+        return False
+      dev.StatusAlive = False
+      dev.StatusTime = time.localtime()
+    self.Expired += 1
+    self.Handler.logger.log(2, 'expired', self.Handler.DEVICE_TYPE, dev.FriendlyName, dev.MaxAge)
+    for event in (self.LivenessEvent, self.Handler.advert_status_change, self.Handler.discovery_status_change):
+      if isinstance(event, threading.Event):
+        event.set()
+    return True
+
+  def _run(self):
+    while self.is_running:
+      expired = []
+      with self.condition:
+        if not self.Heap:
+          self.condition.wait()
+          continue
+        now = time.monotonic()
+        delay = self.Heap[0][0] - now
+        if delay > 0:
+          self.condition.wait(delay)
+          continue
+        while self.Heap and self.Heap[0][0] <= now:
+          expiry, seq, dev = heapq.heappop(self.Heap)
+          if dev.StatusAlive and dev.ExpiryTime is not None and dev.ExpiryTime > expiry:
+            self.seq += 1
+            heapq.heappush(self.Heap, (dev.ExpiryTime, self.seq, dev))
+          else:
+            self.Scheduled.discard(dev)
+            expired.append(dev)
+      for dev in expired:
+        self._expire(dev)
+
+  def start(self):
+    if self.is_running:
+      return False
+    self.is_running = True
+    for dev in tuple(self.Handler.Devices):
+      if dev.StatusAlive and dev.ExpiryTime is not None:
+        self.schedule(dev)
+    self.monitor_thread = threading.Thread(target=self._run, daemon=True)
+    self.monitor_thread.start()
+    return True
+
+  def stop(self):
+    with self.condition:
+      if not self.is_running:
+        return
+      self.is_running = False
+      self.Heap.clear()
+      self.Scheduled.clear()
+      self.condition.notify()
+    self.monitor_thread.join()
+    self.is_running = None
+
+
+class DLNASubscriptionRenewer:
+
+  def __init__(self, handler, fraction=0.5, jitter=0.1, retry_delay=5, max_retry_delay=300, workers=4):
+    self.Handler = handler
+    self.fraction = fraction
+    self.jitter = jitter
+    self.retry_delay = retry_delay
+    self.max_retry_delay = max_retry_delay
+    self.workers = workers
+    self.Heap = []
+    self.Scheduled = {}
+    self.Renewed = 0
+    self.Resubscribed = 0
+    self.Failed = 0
+    self.condition = threading.Condition()
+    self.seq = 0
+    self.executor = None
+    self.renewer_thread = None
+    self.is_running = None
+
+  def schedule(self, eventlistener, delay):
+    with self.condition:
+      if not self.is_running:
+        return False
+      due = time.monotonic() + max(delay, 0)
+      self.Scheduled[eventlistener] = due
+      self.seq += 1
+      heapq.heappush(self.Heap, (due, self.seq, eventlistener))
+      if self.Heap[0][2] is eventlistener:
+        self.condition.notify()
+      return True
+
+  def add(self, eventlistener):
+    if not eventlistener.is_running or eventlistener.Timeout is None:
+      return False
+    eventlistener.RenewalFailures = 0
+    return self.schedule(eventlistener, eventlistener.Timeout * self.fraction * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+  def remove(self, eventlistener):
+    with self.condition:
+      self.Scheduled.pop(eventlistener, None)
+
+  def _retry(self, eventlistener):
+    self.Failed += 1
+    eventlistener.RenewalFailures += 1
+    delay = min(self.retry_delay * 2 ** (eventlistener.RenewalFailures - 1), self.max_retry_delay)
+    if eventlistener.ExpiryTime is not None:
+      remaining = eventlistener.ExpiryTime - time.monotonic()
+      if remaining > 0:
+        delay = min(delay, remaining / 2 if remaining > 1 else remaining)
+    self.schedule(eventlistener, delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+  def _renew(self, eventlistener):
+    if not eventlistener.is_running:
+      return
+    try:
+      expired = eventlistener.ExpiryTime is not None and eventlistener.ExpiryTime <= time.monotonic()
+      if not expired:
+        resp = self.Handler._renew_subscription(eventlistener, eventlistener.RequestedTimeout)
+        if resp.code == '200':
+          self.Renewed += 1
+          self.add(eventlistener)
+          return
+        expired = resp.code == '412'
+      if expired and eventlistener.is_running:
+        if self.Handler._resubscribe(eventlistener):
+          self.Resubscribed += 1
+          self.add(eventlistener)
+          return
+    except:
+      pass
+    if eventlistener.is_running:
+      if eventlistener.ExpiryTime is not None and eventlistener.ExpiryTime <= time.monotonic() and eventlistener.Device.StateCache is not None:
+        eventlistener.Device.StateCache.detach(eventlistener)
+      self._retry(eventlistener)
+
+  def _run(self):
+    while self.is_running:
+      due_listeners = []
+      with self.condition:
+        if not self.Heap:
+          self.condition.wait()
+          continue
+        now = time.monotonic()
+        delay = self.Heap[0][0] - now
+        if delay > 0:
+          self.condition.wait(delay)
+          continue
+        while self.Heap and self.Heap[0][0] <= now:
+          due, seq, eventlistener = heapq.heappop(self.Heap)
+          if self.Scheduled.get(eventlistener) == due:
+            del self.Scheduled[eventlistener]
+            due_listeners.append(eventlistener)
+      for eventlistener in due_listeners:
+        self.executor.submit(self._renew, eventlistener)
+
+  def start(self, eventlisteners=()):
+    if self.is_running:
+      return False
+    self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='renewal')
+    self.is_running = True
+    for eventlistener in eventlisteners:
+      self.add(eventlistener)
+    self.renewer_thread = threading.Thread(target=self._run, daemon=True)
+    self.renewer_thread.start()
+    return True
+
+  def stop(self):
+    with self.condition:
+      if not self.is_running:
+        return
+      self.is_running = False
+      self.Heap.clear()
+      self.Scheduled.clear()
+      self.condition.notify()
+    self.renewer_thread.join()
+    self.executor.shutdown(wait=True)
+    self.is_running = None
+
+  def stats(self):
+    with self.condition:
+      return {'scheduled': len(self.Scheduled), 'renewed': self.Renewed, 'resubscribed': self.Resubscribed, 'failed': self.Failed}
+
+
+class DLNAFlight:
+
+  __slots__ = ('registered', 'done', 'result')
+
+  def __init__(self):
+    self.registered = threading.Event()
+    self.done = threading.Event()
+    self.result = None
+
+
+class DLNASingleFlight:
+
+  def __init__(self):
+    self.Flights = {}
+    self.Coalesced = 0
+    self.lock = threading.Lock()
+
+  def join(self, key):
+    with self.lock:
+      flight = self.Flights.get(key)
+      if flight is not None:
+        self.Coalesced += 1
+        return flight, False
+      flight = self.Flights[key] = DLNAFlight()
+      return flight, True
+
+  def land(self, key, flight, result):
+    flight.result = result
+    with self.lock:
+      if self.Flights.get(key) is flight:
+        del self.Flights[key]
+    flight.registered.set()
+    flight.done.set()
+
+  def do(self, key, func, *args, **kwargs):
+    flight, leader = self.join(key)
+    if not leader:
+      flight.done.wait()
+      return flight.result
+    result = None
+    try:
+      result = func(*args, **kwargs)
+    finally:
+      self.land(key, flight, result)
+    return result
+
+
+class DLNAStateCache:
+
+  DEFAULT_TTLS = {'TransportState': 1, 'TransportStatus': 1, 'RelTime': 0.5, 'MediaDuration': 30, 'TrackDuration': 30, 'Volume': 5, 'Mute': 5}
+  EVENT_VARIABLES = {'TransportState': 'TransportState', 'TransportStatus': 'TransportStatus', 'CurrentMediaDuration': 'MediaDuration', 'CurrentTrackDuration': 'TrackDuration', 'Volume': 'Volume', 'Mute': 'Mute'}
+  COMMAND_INVALIDATIONS = {
+    'SetAVTransportURI': ('TransportState', 'TransportStatus', 'RelTime', 'MediaDuration', 'TrackDuration'),
+    'Play': ('TransportState', 'TransportStatus', 'RelTime'),
+    'Stop': ('TransportState', 'TransportStatus', 'RelTime'),
+    'Pause': ('TransportState', 'TransportStatus', 'RelTime'),
+    'Seek': ('RelTime',),
+    'SetVolume': ('Volume',),
+    'SetMute': ('Mute',)
+  }
+
+  def __init__(self, ttls=None):
+    self.TTLs = dict(self.DEFAULT_TTLS, **(ttls or {}))
+    self.Values = {}
+    self.Queries = DLNASingleFlight()
+    self.Hits = 0
+    self.Misses = 0
+    self.lock = threading.Lock()
+
+  def _valid(self, entry, now):
+    if entry is None:
+      return False
+    if entry[1] > now:
+      return True
+    listener = entry[2]
+    return listener is not None and bool(listener.is_running) and (listener.ExpiryTime is None or listener.ExpiryTime > now) and bool(listener.Device.StatusAlive)
+
+  def get(self, variables, fetch):
+    now = time.monotonic()
+    with self.lock:
+      entries = tuple(self.Values.get(v) for v in variables)
+      if all(self._valid(entry, now) for entry in entries):
+        self.Hits += 1
+        return entries[0][0] if len(entries) == 1 else tuple(entry[0] for entry in entries)
+      self.Misses += 1
+    return self.Queries.do(variables, self._fetch, variables, fetch)
+
+  def _fetch(self, variables, fetch):
+    value = fetch()
+    if value is not None:
+      self.set(*zip(variables, ((value,) if len(variables) == 1 else value)))
+    return value
+
+  def set(self, *variables_values, listener=None):
+    now = time.monotonic()
+    with self.lock:
+      for variable, value in variables_values:
+        self.Values[variable] = (value, now + self.TTLs.get(variable, 0), listener)
+
+  def invalidate(self, *variables):
+    with self.lock:
+      for variable in (variables or list(self.Values.keys())):
+        self.Values.pop(variable, None)
+
+  def detach(self, listener):
+    with self.lock:
+      for variable, entry in list(self.Values.items()):
+        if entry[2] is listener:
+          del self.Values[variable]
+
+  def update_from_event(self, listener, changes, channels=None):
+    if channels is None:
+      channels = (None,) * len(changes)
+    changes = tuple((self.EVENT_VARIABLES[prop_name], prop_nvalue) for (prop_name, prop_nvalue), channel in zip(changes, channels) if prop_name in self.EVENT_VARIABLES and (channel is None or channel.lower() == 'master'))
+    if changes:
+      self.set(*changes, listener=listener)
+
+  def stats(self):
+    with self.lock:
+      return {'hits': self.Hits, 'misses': self.Misses, 'coalesced': self.Queries.Coalesced, 'variables': len(self.Values)}
+
+
+class DLNALatencyStats:
+
+  def __init__(self, alpha=0.125, beta=0.25, window=64):
+    self.alpha = alpha
+    self.beta = beta
+    self.EWMA = None
+    self.EWMDev = None
+    self.Samples = collections.deque(maxlen=window)
+    self.Count = 0
+    self.Failures = 0
+    self.lock = threading.Lock()
+
+  def add(self, latency, failure=False):
+    with self.lock:
+      if failure:
+        self.Failures += 1
+      self.Count += 1
+      self.Samples.append(latency)
+      if self.EWMA is None:
+        self.EWMA = latency
+        self.EWMDev = latency / 2
+      else:
+        self.EWMDev += self.beta * (abs(latency - self.EWMA) - self.EWMDev)
+        self.EWMA += self.alpha * (latency - self.EWMA)
+
+  def percentile(self, p):
+    with self.lock:
+      samples = sorted(self.Samples)
+    if not samples:
+      return None
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+  def timeout(self, default, floor, ceiling, min_samples=5, margin=2):
+    with self.lock:
+      if self.Count < min_samples:
+        return default
+      ewma = self.EWMA + 4 * self.EWMDev
+    return max(floor, min(ceiling, margin * max(ewma, self.percentile(0.99))))
+
+  def stats(self):
+    with self.lock:
+      count, failures, ewma, ewmdev = self.Count, self.Failures, self.EWMA, self.EWMDev
+    return {'count': count, 'failures': failures, 'ewma': ewma, 'ewmdev': ewmdev, 'p50': self.percentile(0.5), 'p90': self.percentile(0.9), 'p99': self.percentile(0.99)}
+
+
+class DLNACircuitBreaker:
+
+  CLOSED = 'closed'
+  OPEN = 'open'
+  HALF_OPEN = 'half-open'
+
+  def __init__(self, threshold=3, backoff=5, max_backoff=300):
+    self.threshold = threshold
+    self.backoff = backoff
+    self.max_backoff = max_backoff
+    self.State = self.CLOSED
+    self.Failures = 0
+    self.Openings = 0
+    self.Rejected = 0
+    self.RetryTime = None
+    self.MarkedDead = False
+    self.current_backoff = backoff
+    self.lock = threading.Lock()
+
+  def allow(self):
+    with self.lock:
+      if self.State == self.CLOSED:
+        return self.CLOSED
+      if self.State == self.OPEN and time.monotonic() >= self.RetryTime:
+        self.State = self.HALF_OPEN
+        return self.HALF_OPEN
+      self.Rejected += 1
+      return None
+
+  def success(self):
+    with self.lock:
+      closed = self.State != self.CLOSED
+      self.State = self.CLOSED
+      self.Failures = 0
+      self.current_backoff = self.backoff
+      return closed
+
+  def failure(self):
+    with self.lock:
+      self.Failures += 1
+      if self.State == self.HALF_OPEN:
+        self.current_backoff = min(self.max_backoff, self.current_backoff * 2)
+      elif self.State == self.OPEN or self.Failures < self.threshold:
+        return None
+      self.State = self.OPEN
+      self.Openings += 1
+      self.RetryTime = time.monotonic() + self.current_backoff * random.uniform(0.9, 1.1)
+      return self.current_backoff
+
+  def abort(self):
+    with self.lock:
+      if self.State != self.HALF_OPEN:
+        return False
+      self.State = self.OPEN
+      self.RetryTime = time.monotonic() + self.current_backoff * random.uniform(0.9, 1.1)
+      return True
+
+
+class DLNAPositionTracker:
+
+  def __init__(self, controller, renderer, resync_interval=10, drift_tolerance=1):
+    self.Controller = controller
+    self.Renderer = renderer
+    self.resync_interval = resync_interval
+    self.drift_tolerance = drift_tolerance
+    self.SamplePosition = None
+    self.SampleTime = None
+    self.Playing = None
+    self.Duration = None
+    self.Samples = 0
+    self.Drifts = 0
+    self.resync_due = True
+    self.lock = threading.Lock()
+
+  @staticmethod
+  def _parse_time(value):
+    try:
+      h, m, s = value.strip().split(':')
+      return int(h) * 3600 + int(m) * 60 + float(s)
+    except:
+      return None
+
+  @staticmethod
+  def _format_time(seconds):
+    seconds = int(seconds)
+    return '%d:%02d:%02d' % (seconds // 3600, (seconds // 60) % 60, seconds % 60)
+
+  def _interpolate(self, now):
+    if self.SamplePosition is None:
+      return None
+    position = self.SamplePosition + (now - self.SampleTime if self.Playing else 0)
+    if self.Duration:
+      position = min(position, self.Duration)
+    return position
+
+  def sample(self):
+    start_time = time.monotonic()
+    out_args = self.Controller.send_soap_msg(self.Renderer, 'AVTransport', 'GetPositionInfo', soap_timeout=3, InstanceID=0)
+    now = (start_time + time.monotonic()) / 2
+    transport_info = self.Controller.get_TransportInfo(self.Renderer)
+    position = self._parse_time(out_args['RelTime']) if out_args else None
+    with self.lock:
+      self.Samples += 1
+      if position is None:
+        self.resync_due = True
+        return None
+      predicted = self._interpolate(now)
+      if predicted is not None and abs(predicted - position) > self.drift_tolerance:
+        self.Drifts += 1
+      self.SamplePosition = position
+      self.SampleTime = now
+      if transport_info:
+        self.Playing = transport_info[0] == 'PLAYING'
+      duration = self._parse_time(out_args['TrackDuration'] or '')
+      if duration:
+        self.Duration = duration
+      self.resync_due = False
+      return position
+
+  def seconds(self):
+    with self.lock:
+      due = self.resync_due or self.SampleTime is None or time.monotonic() - self.SampleTime >= self.resync_interval
+    if due:
+      self.sample()
+    with self.lock:
+      return self._interpolate(time.monotonic())
+
+  def position(self):
+    seconds = self.seconds()
+    return None if seconds is None else self._format_time(seconds)
+
+  def seeked(self, target):
+    position = self._parse_time(target)
+    with self.lock:
+      if position is not None:
+        self.SamplePosition = position
+        self.SampleTime = time.monotonic()
+      self.resync_due = True
+
+  def update_from_event(self, changes):
+    now = time.monotonic()
+    with self.lock:
+      for prop_name, prop_nvalue in changes:
+        if prop_name == 'TransportState':
+          playing = prop_nvalue == 'PLAYING'
+          if playing != self.Playing:
+            self.SamplePosition = self._interpolate(now)
+            self.SampleTime = now
+            self.Playing = playing
+            self.resync_due = True
+        elif prop_name == 'CurrentTrackDuration':
+          self.Duration = self._parse_time(prop_nvalue) or self.Duration
+        elif prop_name == 'RelativeTimePosition':
+          position = self._parse_time(prop_nvalue)
+          if position is not None:
+            self.SamplePosition = position
+            self.SampleTime = now
+
+
+class DLNACommandQueue:
+
+  COALESCABLE = {
+    ('RenderingControl', 'SetVolume'): ('InstanceID', 'Channel'),
+    ('RenderingControl', 'SetMute'): ('InstanceID', 'Channel'),
+    ('AVTransport', 'Seek'): ('InstanceID', 'Unit')
+  }
+
+  def __init__(self, handler, device):
+    self.Handler = handler
+    self.Device = device
+    self.Pending = collections.OrderedDict()
+    self.Submitted = 0
+    self.Sent = 0
+    self.Coalesced = 0
+    self.condition = threading.Condition()
+    self.thread = None
+
+  def submit(self, service, action, soap_timeout=5, soap_stop=None, **arguments):
+    keys = self.COALESCABLE.get((service, action))
+    key = object() if keys is None else (service, action, *(str(arguments.get(k)) for k in keys))
+    with self.condition:
+      self.Submitted += 1
+      entry = self.Pending.get(key)
+      if entry is not None:
+        self.Coalesced += 1
+        self.Handler.logger.log(2, 'commandcoalesced', self.Handler.DEVICE_TYPE, self.Device.FriendlyName, service, action)
+        entry[3:] = soap_timeout, soap_stop, arguments
+        self.Pending.move_to_end(key)
+        return entry[0]
+      future = concurrent.futures.Future()
+      self.Pending[key] = [future, service, action, soap_timeout, soap_stop, arguments]
+      if self.thread is None:
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+      return future
+
+  def _work(self):
+    while True:
+      with self.condition:
+        if not self.Pending:
+          self.thread = None
+          return
+        future, service, action, soap_timeout, soap_stop, arguments = self.Pending.popitem(last=False)[1]
+        self.Sent += 1
+      if not future.set_running_or_notify_cancel():
+        continue
+      try:
+        future.set_result(self.Handler._send_soap_msg(self.Device, service, action, soap_timeout, soap_stop, **arguments))
+      except Exception as e:
+        future.set_exception(e)
+
+  def stats(self):
+    with self.condition:
+      return {'submitted': self.Submitted, 'sent': self.Sent, 'coalesced': self.Coalesced, 'pending': len(self.Pending)}
+
+
+class DLNADeviceRegistry:
+
+  def __init__(self):
+    self.Devices = []
+    self.Hips = []
+    self.ByUDN = {}
+    self.ByKey = {}
+    self.ByName = {}
+
+  @staticmethod
+  def _normalize(name):
+    return (name or '').lower()
+
+  def __len__(self):
+    return len(self.Devices)
+
+  def __iter__(self):
+    return iter(self.Devices)
+
+  def get(self, desc_url, udn):
+    d = self.ByKey.get((desc_url, udn))
+    return None if d is None else self.Devices[d]
+
+  def register(self, device, hip):
+    device.Hip = hip
+    key = (device.DescURL, device.UDN)
+    name = self._normalize(device.FriendlyName)
+    d = self.ByKey.get(key)
+    if d is None:
+      d = len(self.Devices)
+      self.Hips.append(hip)
+      self.Devices.append(device)
+      self.ByKey[key] = d
+      self.ByUDN.setdefault(device.UDN, []).append(d)
+      self.ByName.setdefault(name, []).append(d)
+      return False
+    oname = self._normalize(self.Devices[d].FriendlyName)
+    self.Hips[d] = hip
+    self.Devices[d] = device
+    if oname != name:
+      inds = self.ByName[oname]
+      inds.remove(d)
+      if not inds:
+        del self.ByName[oname]
+      inds = self.ByName.setdefault(name, [])
+      inds.insert(next((i for i, e in enumerate(inds) if e > d), len(inds)), d)
+    return True
+
+  def search(self, uuid=None, name=None, complete=False):
+    if uuid:
+      inds = self.ByUDN.get('uuid:' + uuid, ())
+      if name:
+        name = self._normalize(name)
+        inds = [d for d in inds if self._normalize(self.Devices[d].FriendlyName) == name]
+    elif name:
+      inds = self.ByName.get(self._normalize(name), ())
+    else:
+      return next((dev for dev in self.Devices if dev.StatusAlive and (not complete or dev.BaseURL)), None)
+    device = None
+    for d in tuple(inds):
+      device = self.Devices[d]
+      if device.StatusAlive and (not complete or device.BaseURL):
+        break
+    return device
 
-  def wait(self, handler, timeout=None):
-    adv_event = None
-    try:
-      adv_event = handler.advert_status_change.wait(timeout)
-    except:
-      pass
-    if adv_event:
-      handler.advert_status_change.clear()
-    return adv_event
+
+class DLNASearchProtocol(asyncio.DatagramProtocol):
+
+  def __init__(self, ip, on_response):
+    self.ip = ip
+    self.on_response = on_response
+
+  def datagram_received(self, data, addr):
+    self.on_response(self.ip, data, addr)
+
+  def error_received(self, exc):
+    pass
 
 
 class DLNAHandler:
@@ -970,17 +2564,36 @@ class DLNAHandler:
     IP = (IP,)
     return IP
 
-  def __init__(self, ip='', verbosity=0):
-    self.Devices = []
-    self.Hips = []
+  def __init__(self, ip='', verbosity=0, description_cache=None, lazy_scpd=False, scpd_connections=3, scpd_deadline=10):
+    self.Registry = DLNADeviceRegistry()
+    self.Devices = self.Registry.Devices
+    self.Hips = self.Registry.Hips
     self.verbosity = verbosity
     self.logger = log_event('dlnahandler', verbosity)
+    if description_cache is None or isinstance(description_cache, DLNADescriptionCache):
+      self.DescriptionCache = description_cache
+    else:
+      self.DescriptionCache = DLNADescriptionCache(description_cache)
     self.advertisement_listener = None
     self.is_advert_receiver_running = None
     self.advert_status_change = None
     self.is_discovery_polling_running = None
     self.discovery_status_change = None
     self.discovery_polling_shutdown = None
+    self.liveness_monitor = None
+    self.DescriptionFetches = DLNASingleFlight()
+    self.ConnectionPool = HTTPConnectionPool()
+    self.validate_soap_arguments = False
+    self.command_queuing = False
+    self.state_cache_ttls = None
+    self.adaptive_timeouts = None
+    self.circuit_breaker = None
+    self.subscription_renewer = None
+    self.device_state_lock = threading.Lock()
+    self.lazy_scpd = lazy_scpd
+    self.scpd_connections = max(1, scpd_connections)
+    self.scpd_deadline = scpd_deadline
+    self.scpd_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix='scpd')
     if ip:
       self.ip = ip
     else:
@@ -1004,27 +2617,69 @@ class DLNAHandler:
       self.ips = self.retrieve_ips()
     self.update_devices = threading.Lock()
 
-  def _update_devices(self, desc_url, time_msg, hip, status_change=None, cond_numb=None):
+  def _device_alive(self, dev, time_msg, max_age=None):
+    if dev.StatusTime < time_msg:
+      dev.StatusTime = time_msg
+      dev.StatusAliveLastTime = time_msg
+    if max_age:
+      dev.MaxAge = max_age
+      dev.ExpiryTime = time.monotonic() + max_age
+      if self.liveness_monitor is not None:
+        self.liveness_monitor.schedule(dev)
+
+  @staticmethod
+  def _device_registered(cond_numb, flight):
+    if cond_numb:
+      with cond_numb[0]:
+        cond_numb[1] += 1
+        cond_numb[0].notify()
+    if flight is not None:
+      flight.registered.set()
+
+  def _update_devices(self, desc_url, time_msg, hip, status_change=None, cond_numb=None, ssdp=None):
+    key = (desc_url, hip)
+    flight, leader = self.DescriptionFetches.join(key)
+    if not leader:
+      flight.registered.wait()
+      self._device_registered(cond_numb, None)
+      flight.done.wait()
+      if flight.result and status_change:
+        try:
+          status_change.set()
+        except:
+          pass
+      return flight.result
+    result = False
+    try:
+      result = self._fetch_device(desc_url, time_msg, hip, status_change, cond_numb, ssdp, flight)
+    finally:
+      self.DescriptionFetches.land(key, flight, result)
+    return result
+
+  def _fetch_device(self, desc_url, time_msg, hip, status_change, cond_numb, ssdp, flight):
     try:
-      resp = HTTPRequest(desc_url, timeout=5, ip=hip)
-      if resp.code != '200':
-        raise
-      root_xml = minidom.parseString(resp.body)
+      cache = self.DescriptionCache
+      cache_entry = None
+      if cache is not None and ssdp:
+        cache_entry = cache.get(ssdp['udn'], desc_url, ssdp['bootid'], ssdp['configid'])
+      if cache_entry is not None:
+        desc_body = cache.description(cache_entry)
+        self.logger.log(2, 'cachehit', self.DEVICE_TYPE, desc_url)
+      else:
+        resp = HTTPRequest(desc_url, timeout=5, ip=hip)
+        if resp.code != '200':
+          raise
+        desc_body = resp.body
+      root_xml = _XMLParse(desc_body)
       if not ('Media' + self.DEVICE_TYPE).lower() in _XMLGetRTagText(root_xml, 'deviceType').lower():
         raise
       udn = _XMLGetRTagText(root_xml, 'UDN')
       self.update_devices.acquire()
-      dind = None
       try:
-        for d, dev in enumerate(self.Devices):
-          if dev.DescURL == desc_url and dev.UDN == udn:
-            if dev.StatusAlive:
-              if dev.StatusTime < time_msg:
-                dev.StatusTime = time_msg
-                dev.StatusAliveLastTime = time_msg
-              raise
-            dind = d
-            break
+        dev = self.Registry.get(desc_url, udn)
+        if dev is not None and dev.StatusAlive:
+          self._device_alive(dev, time_msg, ssdp['max_age'] if ssdp else None)
+          raise
         try:
           device = eval('DLNA' + self.DEVICE_TYPE + '()')
         except:
@@ -1041,10 +2696,7 @@ class DLNAHandler:
         self.update_devices.release()
         raise
     except:
-      if cond_numb:
-        with cond_numb[0]:
-          cond_numb[1] += 1
-          cond_numb[0].notify()
+      self._device_registered(cond_numb, flight)
       return False
     try:
       device.IconURL = None
@@ -1074,17 +2726,10 @@ class DLNAHandler:
     device.StatusAlive = True
     device.StatusTime = time_msg
     device.StatusAliveLastTime = time_msg
-    if dind is None:
-      self.Hips.append(hip)
-      self.Devices.append(device)
-    else:
-      self.Hips[d] = hip
-      self.Devices[d] = device
+    replaced = self.Registry.register(device, hip)
+    self._device_alive(device, time_msg, ssdp['max_age'] if ssdp else None)
     self.update_devices.release()
-    if cond_numb:
-      with cond_numb[0]:
-        cond_numb[1] += 1
-        cond_numb[0].notify()
+    self._device_registered(cond_numb, flight)
     try:
       device.Manufacturer = _XMLGetRTagText(root_xml, 'manufacturer')
     except:
@@ -1093,7 +2738,7 @@ class DLNAHandler:
       device.ModelName = _XMLGetRTagText(root_xml, 'modelName')
     except:
       pass
-    if dind is None:
+    if not replaced:
       self.logger.log(1, 'registering', self.DEVICE_TYPE.lower(), device.FriendlyName, hip)
     try:
       device.ModelDesc = _XMLGetRTagText(root_xml, 'modelDescription')
@@ -1107,6 +2752,9 @@ class DLNAHandler:
       device.SerialNumber = _XMLGetRTagText(root_xml, 'serialNumber')
     except:
       pass
+    scpds = {}
+    cache_udn = ssdp['udn'] if ssdp and ssdp['udn'] else udn
+    services = []
     for node in _XMLGetRTagElements(root_xml, 'service'):
       service = DLNAService()
       try:
@@ -1123,72 +2771,189 @@ class DLNAHandler:
           continue
       except:
         continue
+      if self.lazy_scpd:
+        service.loader = partial(self._load_scpd, hip, cache_udn)
+      services.append(service)
+    loaded = (True,) * len(services) if self.lazy_scpd else self._load_scpds(hip, cache_udn, services, scpds)
+    for service, service_loaded in zip(services, loaded):
+      if service_loaded:
+        device.Services.append(service)
+        device.ServicesIndex.setdefault(service.Id, service)
+    if cache is not None:
+      if cache_entry is None:
+        cache.put(cache_udn, desc_url, *((ssdp['bootid'], ssdp['configid']) if ssdp else (None, None)), desc_body, scpds)
+      else:
+        for url, body in scpds.items():
+          cache.put_scpd(cache_udn, url, body)
+    device.BaseURL = baseurl
+    if status_change:
       try:
-        resp = HTTPRequest(service.DescURL, timeout=5, ip=hip)
-        if resp.code != '200':
-          raise
+        status_change.set()
       except:
-        continue
-      root_s_xml = minidom.parseString(resp.body)
-      for node_s in _XMLGetSTagElements(root_s_xml, 'action'):
-        action = DLNAAction()
+        pass
+    return True
+
+  @staticmethod
+  def _fetch_scpd(url, hip, pconnection=None, max_time=None):
+    try:
+      resp = HTTPRequest(url, timeout=5, max_time=max_time, pconnection=pconnection, ip=hip)
+      if resp.code != '200':
+        raise
+      return resp.body
+    except:
+      return None
+
+  def _load_scpd(self, hip, cache_udn, service):
+    cache = self.DescriptionCache
+    scpd_body = None if cache is None else cache.get_scpd(cache_udn, service.DescURL)
+    if scpd_body is None:
+      scpd_body = self._fetch_scpd(service.DescURL, hip)
+      if scpd_body is None:
+        return False
+      if cache is not None:
+        cache.put_scpd(cache_udn, service.DescURL, scpd_body)
+    try:
+      self._compile_scpd(service, _XMLParse(scpd_body))
+    except:
+      return False
+    return True
+
+  def _load_scpds(self, hip, cache_udn, services, scpds):
+    cache = self.DescriptionCache
+    bodies = [None if cache is None else cache.get_scpd(cache_udn, service.DescURL) for service in services]
+    pending = collections.deque(i for i, body in enumerate(bodies) if body is None)
+    fetched = tuple(pending)
+    if pending:
+      deadline = time.monotonic() + self.scpd_deadline
+      def _fetch():
+        pconnection = [None]
         try:
-          action.Name = _XMLGetSTagText(node_s, 'name')
-        except:
-          continue
-        for node_a in _XMLGetSTagElements(node_s, 'argument'):
-          argument = DLNAArgument()
-          try:
-            argument.Name = _XMLGetSTagText(node_a, 'name')
-            argument.Direction = _XMLGetSTagText(node_a, 'direction')
-            statevar = _XMLGetSTagText(node_a, 'relatedStateVariable')
-            node_sv = next(sv for sv in _XMLGetSTagElements(root_s_xml, 'stateVariable') if _XMLGetSTagElements(sv, 'name')[0].childNodes[0].data == statevar)
-            if node_sv.getAttribute('sendEvents') == 'yes':
-              argument.Event = True
-            elif node_sv.getAttribute('sendEvents') == 'no':
-              argument.Event = False
-            argument.Type = _XMLGetSTagText(node_sv, 'dataType')
-            try:
-              node_sv_av = _XMLGetSTagElements(node_sv, 'allowedValueList')[0]
-              argument.AllowedValueList = *(_XMLGetNodeText(av) for av in _XMLGetSTagElements(node_sv_av,'allowedValue')),
-            except:
-              pass
-            try:
-              node_sv_ar = _XMLGetSTagElements(node_sv, 'allowedValueRange')[0]
-              argument.AllowedValueRange = (_XMLGetSTagText(node_sv_ar, 'minimum'), _XMLGetSTagText(node_sv_ar, 'maximum'))
-            except:
-              pass
+          while True:
+            rem_time = deadline - time.monotonic()
+            if rem_time <= 0:
+              break
             try:
-              argument.DefaultValue = _XMLGetSTagText(node_sv, 'defaultValue')
-            except:
-              pass
+              i = pending.popleft()
+            except IndexError:
+              break
+            bodies[i] = self._fetch_scpd(services[i].DescURL, hip, pconnection, rem_time)
+        finally:
+          try:
+            pconnection[0].close()
           except:
-            argument = None
-            continue
-          if argument:
-            action.Arguments.append(argument)
-          else:
-            action = None
-            break
-        if action:
-          service.Actions.append(action)
-      service.EventThroughLastChange = False
+            pass
+      futures = [self.scpd_executor.submit(_fetch) for f in range(min(self.scpd_connections, len(pending)) - 1)]
+      _fetch()
+      concurrent.futures.wait(futures, timeout=max(0, deadline - time.monotonic()))
+      for future in futures:
+        future.cancel()
+      bodies = list(bodies)
+      for i in fetched:
+        if bodies[i] is not None:
+          scpds[services[i].DescURL] = bodies[i]
+    loaded = []
+    for service, scpd_body in zip(services, bodies):
       try:
-        node_sv = next(sv for sv in _XMLGetSTagElements(root_s_xml, 'stateVariable') if _XMLGetSTagElements(sv, 'name')[0].childNodes[0].data.upper() == 'LastChange'.upper())
-        if node_sv.getAttribute('sendEvents') == 'yes':
-          service.EventThroughLastChange = True
+        self._compile_scpd(service, _XMLParse(scpd_body))
+        loaded.append(True)
       except:
-        pass
-      device.Services.append(service)
-    device.BaseURL = baseurl
-    if status_change:
+        loaded.append(False)
+    return loaded
+
+  def prefetch(self, device, *services):
+    loaded = True
+    for serv in device.Services:
+      if not services or serv.Id[23:] in services:
+        loaded = serv.load() and loaded
+    return loaded
+
+  @staticmethod
+  def _parse_number(value):
+    try:
+      return int(value)
+    except:
+      return float(value)
+
+  @classmethod
+  def _compile_statevariable(cls, node_sv):
+    statevar = DLNAStateVariable()
+    statevar.Name = _XMLGetSTagText(node_sv, 'name')
+    if node_sv.getAttribute('sendEvents') == 'yes':
+      statevar.Event = True
+    elif node_sv.getAttribute('sendEvents') == 'no':
+      statevar.Event = False
+    try:
+      statevar.Type = _XMLGetSTagText(node_sv, 'dataType')
+    except:
+      pass
+    try:
+      node_sv_av = _XMLGetSTagElements(node_sv, 'allowedValueList')[0]
+      statevar.AllowedValueList = *(_XMLGetNodeText(av) for av in _XMLGetSTagElements(node_sv_av,'allowedValue')),
+      statevar.AllowedValues = frozenset(statevar.AllowedValueList)
+    except:
+      pass
+    try:
+      node_sv_ar = _XMLGetSTagElements(node_sv, 'allowedValueRange')[0]
+      statevar.AllowedValueRange = (_XMLGetSTagText(node_sv_ar, 'minimum'), _XMLGetSTagText(node_sv_ar, 'maximum'))
       try:
-        status_change.set()
+        step = cls._parse_number(_XMLGetSTagText(node_sv_ar, 'step'))
       except:
-        pass
-    return True
+        step = None
+      statevar.AllowedRange = (cls._parse_number(statevar.AllowedValueRange[0]), cls._parse_number(statevar.AllowedValueRange[1]), step)
+    except:
+      pass
+    try:
+      statevar.DefaultValue = _XMLGetSTagText(node_sv, 'defaultValue')
+    except:
+      pass
+    return statevar
 
-  def _discover(self, uuid=None, timeout=2, alive_persistence=0, from_polling=False):
+  @classmethod
+  def _compile_scpd(cls, service, root_s_xml):
+    statevars = {}
+    for node_sv in _XMLGetSTagElements(root_s_xml, 'stateVariable'):
+      try:
+        statevar = cls._compile_statevariable(node_sv)
+      except:
+        continue
+      statevars.setdefault(statevar.Name, statevar)
+    actions = []
+    actions_index = {}
+    for node_s in _XMLGetSTagElements(root_s_xml, 'action'):
+      action = DLNAAction()
+      try:
+        action.Name = _XMLGetSTagText(node_s, 'name')
+      except:
+        continue
+      for node_a in _XMLGetSTagElements(node_s, 'argument'):
+        argument = DLNAArgument()
+        try:
+          argument.Name = _XMLGetSTagText(node_a, 'name')
+          argument.Direction = _XMLGetSTagText(node_a, 'direction')
+          statevar = statevars[_XMLGetSTagText(node_a, 'relatedStateVariable')]
+          if statevar.Type is None:
+            raise
+        except:
+          continue
+        argument.StateVariable = statevar
+        argument.Event = statevar.Event
+        argument.Type = statevar.Type
+        argument.AllowedValueList = statevar.AllowedValueList
+        argument.AllowedValueRange = statevar.AllowedValueRange
+        argument.DefaultValue = statevar.DefaultValue
+        action.Arguments.append(argument)
+      action.InArguments = tuple(arg for arg in action.Arguments if arg.Direction == 'in')
+      action.OutArguments = tuple(arg for arg in action.Arguments if arg.Direction == 'out')
+      action.Template = DLNASOAPTemplate((service.Id or '')[23:], action)
+      actions.append(action)
+      actions_index.setdefault(action.Name, action)
+    statevar = next((sv for n, sv in statevars.items() if n.upper() == 'LastChange'.upper()), None)
+    service.StateVariables = statevars
+    service.Actions = actions
+    service.ActionsIndex = actions_index
+    service.EventThroughLastChange = bool(statevar and statevar.Event)
+
+  def _msearch_message(self, uuid=None):
     if uuid:
       self.logger.log(2, 'msearch1', uuid)
       msg = \
@@ -1216,6 +2981,37 @@ class DLNAHandler:
       'MX: 2\r\n' \
       'MAN: "ssdp:discover"\r\n' \
       '\r\n' % self.DEVICE_TYPE
+    return msg.encode("ISO-8859-1")
+
+  def _msearch_location(self, resp, addr, uuid=None):
+    try:
+      resp = HTTPMessage((resp, addr), body=False)
+      if resp.code != '200' or not (uuid or ('' if self.DEVICE_TYPE == 'Device' else ('Media' + self.DEVICE_TYPE))).lower() in resp.header('ST', '').lower():
+        return None
+      loca = resp.header('Location')
+      if (urllib.parse.urlparse(loca)).netloc.split(':',1)[0] == addr[0]:
+        return loca, _SSDPGetInfo(resp)
+      else:
+        self.logger.log(2, 'ignored', *addr)
+    except:
+      pass
+    return None
+
+  def _trim_devices(self, uuid, time_req, time_resp, alive_persistence):
+    trimmed = False
+    monitored = bool(self.liveness_monitor and self.liveness_monitor.is_running)
+    for dev in self.Devices:
+      if dev.StatusAlive and not (monitored and dev.ExpiryTime is not None):
+        if (True if not uuid else dev.UDN == 'uuid:' + uuid):
+          with self.update_devices:
+            if time.mktime(time_req) - time.mktime(dev.StatusAliveLastTime) > alive_persistence:
+              dev.StatusAlive = False
+              dev.StatusTime = time_resp
+              trimmed = True
+    return trimmed
+
+  def _discover(self, uuid=None, timeout=2, alive_persistence=0, from_polling=False):
+    msg = self._msearch_message(uuid)
     socks = []
     for ip in self.ips:
       sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
@@ -1224,11 +3020,11 @@ class DLNAHandler:
       try:
         sock.bind((ip, 0))
         try:
-          sock.sendto(msg.encode("ISO-8859-1"), (ip, 1900))
+          sock.sendto(msg, (ip, 1900))
         except:
           pass
         try:
-          sock.sendto(msg.encode("ISO-8859-1"), ('239.255.255.250', 1900))
+          sock.sendto(msg, ('239.255.255.250', 1900))
           self.logger.log(2, 'sent', ip)
         except:
           self.logger.log(1, 'fail', ip)
@@ -1258,19 +3054,11 @@ class DLNAHandler:
             resp, addr = sock.recvfrom(65507)
             self.logger.log(2, 'receipt', ip, *addr)
             time_resp = time.localtime()
-            try:
-              resp = HTTPMessage((resp, addr), body=False)
-              if resp.code != '200' or not (uuid or ('' if self.DEVICE_TYPE == 'Device' else ('Media' + self.DEVICE_TYPE))).lower() in resp.header('ST', '').lower():
-                continue
-              loca = resp.header('Location')
-              if (urllib.parse.urlparse(loca)).netloc.split(':',1)[0] == addr[0]:
-                t = threading.Thread(target=self._update_devices, args=(loca, time_resp, ip, self.discovery_status_change if from_polling else None, cond_numb), daemon=True)
-                tupds.append(t)
-                t.start()
-              else:
-                self.logger.log(2, 'ignored', *addr)
-            except:
-              pass
+            loca_ssdp = self._msearch_location(resp, addr, uuid)
+            if loca_ssdp:
+              t = threading.Thread(target=self._update_devices, args=(loca_ssdp[0], time_resp, ip, self.discovery_status_change if from_polling else None, cond_numb, loca_ssdp[1]), daemon=True)
+              tupds.append(t)
+              t.start()
           except:
             pass
     time_resp = time.localtime()
@@ -1284,15 +3072,7 @@ class DLNAHandler:
       with cond_numb[0]:
         while cond_numb[1] < tot_numb:
           cond_numb[0].wait()
-    trimmed = False
-    for dev in self.Devices:
-      if dev.StatusAlive:
-        if (True if not uuid else dev.UDN == 'uuid:' + uuid):
-          with self.update_devices:
-            if time.mktime(time_req) - time.mktime(dev.StatusAliveLastTime) > alive_persistence:
-              dev.StatusAlive = False
-              dev.StatusTime = time_resp
-              trimmed = True
+    trimmed = self._trim_devices(uuid, time_req, time_resp, alive_persistence)
     if trimmed and from_polling:
       try:
         self.discovery_status_change.set()
@@ -1310,31 +3090,50 @@ class DLNAHandler:
     else:
       self._discover(uuid, timeout, alive_persistence, from_polling)
 
+  async def discover_async(self, uuid=None, timeout=2, alive_persistence=0, max_fetches=8):
+    loop = asyncio.get_running_loop()
+    msg = self._msearch_message(uuid)
+    semaphore = asyncio.Semaphore(max_fetches)
+    fetches = []
+    async def _fetch(loca, time_resp, ip, ssdp):
+      async with semaphore:
+        return await loop.run_in_executor(None, partial(self._update_devices, loca, time_resp, ip, ssdp=ssdp))
+    def _on_response(ip, resp, addr):
+      self.logger.log(2, 'receipt', ip, *addr)
+      time_resp = time.localtime()
+      loca_ssdp = self._msearch_location(resp, addr, uuid)
+      if loca_ssdp:
+        fetches.append(loop.create_task(_fetch(loca_ssdp[0], time_resp, ip, loca_ssdp[1])))
+    transports = []
+    time_req = time.localtime()
+    for ip in self.ips:
+      try:
+        transport, protocol = await loop.create_datagram_endpoint(partial(DLNASearchProtocol, ip, _on_response), local_addr=(ip, 0), family=socket.AF_INET)
+      except:
+        self.logger.log(1, 'fail', ip)
+        continue
+      transports.append(transport)
+      try:
+        transport.sendto(msg, (ip, 1900))
+      except:
+        pass
+      try:
+        transport.sendto(msg, ('239.255.255.250', 1900))
+        self.logger.log(2, 'sent', ip)
+      except:
+        self.logger.log(1, 'fail', ip)
+    try:
+      await asyncio.sleep(timeout)
+    finally:
+      for transport in transports:
+        transport.close()
+    if fetches:
+      await asyncio.gather(*fetches, return_exceptions=True)
+    self._trim_devices(uuid, time_req, time.localtime(), alive_persistence)
+    return self.Devices
+
   def search(self, uuid=None, name=None, complete=False):
-    device = None
-    for dev in self.Devices:
-      if uuid:
-        if name:
-          if dev.UDN == 'uuid:' + uuid and dev.FriendlyName.lower() == name.lower():
-            device = dev
-            if dev.StatusAlive and (not complete or dev.BaseURL):
-              break
-        else:
-          if dev.UDN == 'uuid:' + uuid:
-            device = dev
-            if dev.StatusAlive and (not complete or dev.BaseURL):
-              break
-      else:
-        if name:
-          if dev.FriendlyName.lower() == name.lower():
-            device = dev
-            if dev.StatusAlive and (not complete or dev.BaseURL):
-              break
-        else:
-          if dev.StatusAlive and (not complete or dev.BaseURL):
-            device = dev
-            break
-    return device
+    return self.Registry.search(uuid, name, complete)
 
   def _discovery_polling(self, timeout=2, alive_persistence=0, polling_period=30):
     self.is_discovery_polling_running = True
@@ -1394,87 +3193,239 @@ class DLNAHandler:
   def _build_soap_msg(self, device, service, action, **arguments):
     if not device:
       return None
-    serv = next((serv for serv in device.Services if serv.Id == ('urn:upnp-org:serviceId:' + service)), None)
+    serv = device.ServicesIndex.get('urn:upnp-org:serviceId:' + service)
     if not serv:
       return None
-    act = next((act for act in serv.Actions if act.Name == action), None)
+    act = serv.ActionsIndex.get(action)
     if not act :
       return None
-    msg_body = \
-      '<?xml version="1.0"?>\n' \
-      '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">\n' \
-      '<s:Body>\n' \
-      '<u:##action## xmlns:u="urn:schemas-upnp-org:service:##service##:1">\n' \
-      '##arguments##' \
-      '</u:##action##>\n' \
-      '</s:Body>\n' \
-      '</s:Envelope>'
-    msg_body = msg_body.replace('##service##', service)
-    msg_body = msg_body.replace('##action##', action)
-    msg_arguments = ''
-    cnt_arg = 0
-    out_args = {}
-    for arg in act.Arguments:
-      if arg.Direction == 'in':
-        if not arguments:
-          return None
-        cnt_arg += 1
-        if not arg.Name in arguments:
-          if arg.DefaultValue:
-            arguments[arg.Name] = arg.DefaultValue
-          else:
-            return None
-        msg_arguments = msg_arguments + '<%s>%s</%s>' % (arg.Name, html.escape(str(arguments[arg.Name])) , arg.Name) + '\n'
-      if arg.Direction == 'out':
-        out_args[arg.Name] = None
-    if arguments:
-      if len(arguments) > cnt_arg:
-        return None
-    msg_body = msg_body.replace('##arguments##', msg_arguments)
-    msg_body_b = msg_body.encode("utf-8")
-    soap_action = 'urn:schemas-upnp-org:service:%s:1#%s' % (service, action)
-    msg_headers = {
-      'User-Agent': 'PlayOn DLNA Controller',
-      'Content-Type': 'text/xml; charset="utf-8"',
-      'SOAPAction': '"%s"' % soap_action
-    }
-    return serv.ControlURL, msg_headers, msg_body_b, out_args
+    msg_body_b = act.Template.build(arguments, self.validate_soap_arguments)
+    if msg_body_b is None:
+      return None
+    return serv.ControlURL, act.Template.Headers, msg_body_b, dict.fromkeys(act.Template.OutArguments)
+
+  def command_queue(self, device):
+    with self.device_state_lock:
+      if device.CommandQueue is None:
+        device.CommandQueue = DLNACommandQueue(self, device)
+      return device.CommandQueue
+
+  def enable_state_cache(self, ttls=None):
+    self.state_cache_ttls = dict(ttls or {})
+    with self.device_state_lock:
+      for device in self.Devices:
+        if device.StateCache is None:
+          device.StateCache = DLNAStateCache(self.state_cache_ttls)
+
+  def state_cache(self, device):
+    if self.state_cache_ttls is None or not device:
+      return None
+    with self.device_state_lock:
+      if device.StateCache is None:
+        device.StateCache = DLNAStateCache(self.state_cache_ttls)
+      return device.StateCache
+
+  def enable_command_queuing(self, enable=True):
+    self.command_queuing = enable
+
+  def submit_soap_msg(self, device, service, action, soap_timeout=5, soap_stop=None, **arguments):
+    if not device:
+      future = concurrent.futures.Future()
+      future.set_result(None)
+      return future
+    return self.command_queue(device).submit(service, action, soap_timeout, soap_stop, **arguments)
+
+  def send_soap_msg(self, device, service, action, soap_timeout=5, soap_stop=None, **arguments):
+    if self.command_queuing and device:
+      return self.submit_soap_msg(device, service, action, soap_timeout, soap_stop, **arguments).result()
+    return self._send_soap_msg(device, service, action, soap_timeout, soap_stop, **arguments)
+
+  def _send_soap_msg(self, device, service, action, soap_timeout=5, soap_stop=None, **arguments):
+    if not device:
+      return None
+    ip = device.Hip
+    if ip is None:
+      return None
+    cturl_headers_body_oargs = self._build_soap_msg(device, service, action, **arguments)
+    if not cturl_headers_body_oargs:
+      self.logger.log(1, 'commandabandonment', self.DEVICE_TYPE, device.FriendlyName, service, action)
+      return None
+    self.logger.log(2, 'commandsending', self.DEVICE_TYPE, device.FriendlyName, service, action)
+    breaker_state = self._breaker_check(device, service, action, cturl_headers_body_oargs[0], ip)
+    if not breaker_state:
+      return None
+    try:
+      action_stats, connect_timeout, max_time = self._soap_timeouts(device, service, action, soap_timeout)
+      start_time = time.monotonic()
+      if self.ConnectionPool is None:
+        resp = HTTPRequest(cturl_headers_body_oargs[0], method='POST', headers=cturl_headers_body_oargs[1], data=cturl_headers_body_oargs[2], timeout=connect_timeout, max_length=104857600, max_time=max_time, stop=soap_stop, ip=ip)
+      else:
+        resp = self.ConnectionPool.request((device.UDN, ip, urllib.parse.urlsplit(cturl_headers_body_oargs[0]).netloc), cturl_headers_body_oargs[0], method='POST', headers=cturl_headers_body_oargs[1], data=cturl_headers_body_oargs[2], timeout=connect_timeout, connect_stats=self._latency_stats(device, 'connect'), max_length=104857600, max_time=max_time, stop=soap_stop, ip=ip)
+      self._record_latency(action_stats, resp, time.monotonic() - start_time, max_time)
+      self._breaker_record(device, resp, soap_stop)
+    finally:
+      if breaker_state == DLNACircuitBreaker.HALF_OPEN:
+        device.CircuitBreaker.abort()
+    return self._soap_result(device, service, action, resp, cturl_headers_body_oargs[3], arguments)
+
+  @staticmethod
+  def _latency_stats(device, name):
+    stats = device.LatencyStats.get(name)
+    if stats is None:
+      stats = device.LatencyStats.setdefault(name, DLNALatencyStats())
+    return stats
+
+  def enable_adaptive_timeouts(self, connect_floor=0.5, connect_ceiling=6, soap_floor=1, soap_ceiling=30, min_samples=5, margin=2):
+    self.adaptive_timeouts = {'connect_floor': connect_floor, 'connect_ceiling': connect_ceiling, 'soap_floor': soap_floor, 'soap_ceiling': soap_ceiling, 'min_samples': min_samples, 'margin': margin}
+
+  def _soap_timeouts(self, device, service, action, soap_timeout):
+    action_stats = self._latency_stats(device, service + '#' + action)
+    adaptive = self.adaptive_timeouts
+    if adaptive is None:
+      return action_stats, 3, soap_timeout + 1
+    connect_timeout = self._latency_stats(device, 'connect').timeout(3, adaptive['connect_floor'], adaptive['connect_ceiling'], adaptive['min_samples'], adaptive['margin'])
+    max_time = action_stats.timeout(soap_timeout + 1, adaptive['soap_floor'], adaptive['soap_ceiling'], adaptive['min_samples'], adaptive['margin'])
+    return action_stats, connect_timeout, max_time
+
+  @staticmethod
+  def _record_latency(action_stats, resp, latency, max_time):
+    if resp.code is not None:
+      action_stats.add(latency)
+    elif latency >= max_time * 0.9:
+      action_stats.add(latency, failure=True)
+
+  def enable_circuit_breaker(self, threshold=3, backoff=5, max_backoff=300, probe_timeout=1, msearch=False):
+    self.circuit_breaker = {'threshold': threshold, 'backoff': backoff, 'max_backoff': max_backoff, 'probe_timeout': probe_timeout, 'msearch': msearch}
+
+  def _circuit_breaker(self, device):
+    if self.circuit_breaker is None:
+      return None
+    if device.CircuitBreaker is None:
+      with self.device_state_lock:
+        if device.CircuitBreaker is None:
+          device.CircuitBreaker = DLNACircuitBreaker(self.circuit_breaker['threshold'], self.circuit_breaker['backoff'], self.circuit_breaker['max_backoff'])
+    return device.CircuitBreaker
+
+  def _breaker_check(self, device, service, action, url, ip):
+    breaker = self._circuit_breaker(device)
+    if breaker is None:
+      return True
+    state = breaker.allow()
+    if state == DLNACircuitBreaker.HALF_OPEN and not self._breaker_probe(device, breaker, url, ip):
+      state = None
+    if state is None:
+      self.logger.log(1, 'commandrejected', self.DEVICE_TYPE, device.FriendlyName, service, action)
+      return False
+    return state
+
+  def _breaker_probe(self, device, breaker, url, ip):
+    try:
+      HTTPRequest.connect(urllib.parse.urlsplit(url, allow_fragments=False), self.circuit_breaker['probe_timeout'], ip).close()
+    except:
+      self._breaker_failure(device, breaker)
+      return False
+    return True
+
+  def _breaker_record(self, device, resp, soap_stop):
+    breaker = device.CircuitBreaker
+    if breaker is None:
+      return
+    if resp.code is not None:
+      if breaker.success():
+        self.logger.log(1, 'breakerclose', self.DEVICE_TYPE, device.FriendlyName)
+        if breaker.MarkedDead:
+          breaker.MarkedDead = False
+          self._breaker_status(device, True)
+    elif not (soap_stop is not None and soap_stop.is_set()):
+      self._breaker_failure(device, breaker)
+
+  def _breaker_failure(self, device, breaker):
+    backoff = breaker.failure()
+    if backoff is None:
+      return
+    self.logger.log(1, 'breakeropen', self.DEVICE_TYPE, device.FriendlyName, breaker.Failures, backoff)
+    if self.circuit_breaker['msearch'] and device.UDN:
+      threading.Thread(target=self._discover, kwargs={'uuid': device.UDN[5:] if device.UDN[:5].lower() == 'uuid:' else device.UDN}, daemon=True).start()
+      return
+    breaker.MarkedDead = self._breaker_status(device, False) or breaker.MarkedDead
+
+  def _breaker_status(self, device, alive):
+    with self.update_devices:
+      if bool(device.StatusAlive) == alive:
+        return False
+      device.StatusAlive = alive
+      device.StatusTime = time.localtime()
+      if alive:
+        device.StatusAliveLastTime = device.StatusTime
+    for event in (self.advert_status_change, self.discovery_status_change):
+      if isinstance(event, threading.Event):
+        event.set()
+    return True
 
-  def send_soap_msg(self, device, service, action, soap_timeout=5, soap_stop=None, **arguments):
-    if not device:
-      return None
-    try:
-      ip = self.Hips[self.Devices.index(device)]
-    except:
-      return None
-    cturl_headers_body_oargs = self._build_soap_msg(device, service, action, **arguments)
-    if not cturl_headers_body_oargs:
-      self.logger.log(1, 'commandabandonment', self.DEVICE_TYPE, device.FriendlyName, service, action)
+  def _soap_result(self, device, service, action, resp, out_args, arguments=None):
+    if device.StateCache is not None and action in DLNAStateCache.COMMAND_INVALIDATIONS:
+      device.StateCache.invalidate(*DLNAStateCache.COMMAND_INVALIDATIONS[action])
+    out_values = fault = None
+    if resp.code is not None and resp.body:
+      try:
+        out_values, fault = _XMLExtractSOAPResponse(resp.body, out_args)
+      except:
+        pass
+    if fault is not None:
+      device.LastSOAPFault = DLNASOAPFault(service, action, fault)
+      self.logger.log(1, 'commandfault', self.DEVICE_TYPE, device.FriendlyName, service, action, device.LastSOAPFault.ErrorCode, device.LastSOAPFault.ErrorDescription)
       return None
-    self.logger.log(2, 'commandsending', self.DEVICE_TYPE, device.FriendlyName, service, action)
-    resp = HTTPRequest(cturl_headers_body_oargs[0], method='POST', headers=cturl_headers_body_oargs[1], data=cturl_headers_body_oargs[2], timeout=3, max_length=104857600, max_time=soap_timeout+1, stop=soap_stop, ip=ip)
     if resp.code != '200':
       self.logger.log(1, 'commandfailure', self.DEVICE_TYPE, device.FriendlyName, service, action)
       return None
     self.logger.log(1, 'commandsuccess', self.DEVICE_TYPE, device.FriendlyName, service, action)
-    try:
-      root_xml = minidom.parseString(resp.body)
-    except:
+    if out_values is None:
       self.logger.log(2, 'responsefailure', self.DEVICE_TYPE, device.FriendlyName, service, action)
       return None
-    out_args = cturl_headers_body_oargs[3]
     try:
       for arg in out_args:
-        out_args[arg] = _XMLGetNodeText(root_xml.getElementsByTagName(arg)[0])
+        out_args[arg] = out_values[arg]
     except:
       self.logger.log(2, 'responsefailure', self.DEVICE_TYPE, device.FriendlyName, service, action)
       return None
     self.logger.log(2, 'responsesuccess', self.DEVICE_TYPE, device.FriendlyName, service, action)
+    if action == 'Seek' and device.PositionTracker is not None and arguments:
+      device.PositionTracker.seeked(str(arguments.get('Target', '')))
     if out_args:
       return out_args
     else:
       return True
 
+  def start_liveness_monitoring(self, LivenessEvent=None):
+    if self.liveness_monitor and self.liveness_monitor.is_running:
+      self.logger.log(1, 'livenessalreadyactivated', self.DEVICE_TYPE.lower())
+      return self.liveness_monitor.LivenessEvent
+    self.logger.log(1, 'livenessstart', self.DEVICE_TYPE.lower())
+    self.liveness_monitor = DLNALivenessMonitor(self, LivenessEvent if isinstance(LivenessEvent, threading.Event) else threading.Event())
+    self.liveness_monitor.start()
+    return self.liveness_monitor.LivenessEvent
+
+  def stop_liveness_monitoring(self):
+    if self.liveness_monitor and self.liveness_monitor.is_running:
+      self.logger.log(1, 'livenessstop', self.DEVICE_TYPE.lower())
+      self.liveness_monitor.stop()
+
+  def start_subscription_renewal(self, *eventlisteners, fraction=0.5, jitter=0.1, retry_delay=5, max_retry_delay=300, workers=4):
+    if self.subscription_renewer and self.subscription_renewer.is_running:
+      self.logger.log(1, 'renewalalreadyactivated')
+      for eventlistener in eventlisteners:
+        self.subscription_renewer.add(eventlistener)
+      return self.subscription_renewer
+    self.logger.log(1, 'renewalstart')
+    self.subscription_renewer = DLNASubscriptionRenewer(self, fraction, jitter, retry_delay, max_retry_delay, workers)
+    self.subscription_renewer.start(eventlisteners)
+    return self.subscription_renewer
+
+  def stop_subscription_renewal(self):
+    if self.subscription_renewer and self.subscription_renewer.is_running:
+      self.logger.log(1, 'renewalstop')
+      self.subscription_renewer.stop()
+
   def start_advertisement_listening(self, AdvertisementEvent=None):
     if self.is_advert_receiver_running:
       self.logger.log(1, 'advertalreadyactivated', self.DEVICE_TYPE.lower())
@@ -1498,17 +3449,16 @@ class DLNAHandler:
     return self.advertisement_listener.wait(self, timeout)
 
   @staticmethod
-  def _process_lastchange(value):
+  def _process_lastchange(value, channels=None):
     return [('LastChange', value)]
 
   def new_event_subscription(self, device, service, port_or_listener, log=False):
     if not device:
       return None
-    try:
-      hip = self.Hips[self.Devices.index(device)]
-    except:
+    hip = device.Hip
+    if hip is None:
       return None
-    serv = next((serv for serv in device.Services if serv.Id == ('urn:upnp-org:serviceId:' + service)), None)
+    serv = device.ServicesIndex.get('urn:upnp-org:serviceId:' + service)
     if not serv:
       return None
     EventListener = DLNAEventListener(log)
@@ -1540,6 +3490,7 @@ class DLNAHandler:
       self.logger.log(1, 'subscralreadyactivated', EventListener.Device.FriendlyName, EventListener.Service.Id[23:])
       return None
     EventListener.is_running = True
+    EventListener.RequestedTimeout = timeout
     if EventListener.event_notification_listener.private:
       EventListener.event_notification_listener.start()
     resp = HTTPRequest(EventListener.Service.SubscrEventURL, method='SUBSCRIBE', headers=msg_headers, ip=EventListener.hip, timeout=5)
@@ -1547,28 +3498,84 @@ class DLNAHandler:
       EventListener.is_running = None
     else:
       EventListener.SID = resp.header('SID', '')
+      EventListener.event_notification_listener.index_sid(EventListener)
       if not EventListener.SID:
         EventListener.is_running = None
     if EventListener.is_running:
+      self._subscription_granted(EventListener, resp)
       self.logger.log(1, 'subscrsuccess', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], EventListener.SID, resp.header('TIMEOUT', ''))
+      if self.subscription_renewer is not None:
+        self.subscription_renewer.add(EventListener)
       return True
     else:
       EventListener.event_notification_listener.unregister(EventListener)
       self.logger.log(1, 'subscrfailure', EventListener.Device.FriendlyName, EventListener.Service.Id[23:])
       return None
     
-  def renew_event_subscription(self, EventListener, timeout):
-    if not EventListener:
-      return None
+  @staticmethod
+  def _subscription_granted(EventListener, resp):
+    granted = resp.header('TIMEOUT', '').strip().lower()
+    if granted in ('second-infinite', 'infinite'):
+      EventListener.Timeout = None
+    else:
+      try:
+        EventListener.Timeout = max(int(granted.rsplit('-', 1)[-1]), 1)
+      except:
+        try:
+          EventListener.Timeout = max(int(EventListener.RequestedTimeout), 1)
+        except:
+          EventListener.Timeout = 1800
+    EventListener.ExpiryTime = None if EventListener.Timeout is None else time.monotonic() + EventListener.Timeout
+
+  def _renew_subscription(self, EventListener, timeout):
     msg_headers = {
     'SID': '%s' % EventListener.SID,
     'Timeout': 'Second-%s' % timeout
     }
-    resp = HTTPRequest(EventListener.Service.SubscrEventURL, method='SUBSCRIBE', headers=msg_headers, ip=EventListener.hip, timeout=5)
-    if resp.code != '200':
+    url = EventListener.Service.SubscrEventURL
+    resp = self.ConnectionPool.request((EventListener.Device.UDN, EventListener.hip, urllib.parse.urlsplit(url).netloc), url, method='SUBSCRIBE', headers=msg_headers, ip=EventListener.hip, timeout=5)
+    if resp.code == '200':
+      EventListener.RequestedTimeout = timeout
+      self._subscription_granted(EventListener, resp)
+      self.logger.log(1, 'subscrrenewsuccess', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], EventListener.SID, resp.header('TIMEOUT', ''))
+    else:
       self.logger.log(1, 'subscrrenewfailure', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], EventListener.SID)
+    return resp
+
+  def _resubscribe(self, EventListener):
+    msg_headers = {
+    'Callback': '<http://%s:%s/%s>' % (EventListener.hip, EventListener.event_notification_listener.port, EventListener.callback_number),
+    'NT': 'upnp:event',
+    'Timeout': 'Second-%s' % EventListener.RequestedTimeout
+    }
+    url = EventListener.Service.SubscrEventURL
+    old_sid = EventListener.SID
+    if EventListener.Device.StateCache is not None:
+      EventListener.Device.StateCache.detach(EventListener)
+    resp = self.ConnectionPool.request((EventListener.Device.UDN, EventListener.hip, urllib.parse.urlsplit(url).netloc), url, method='SUBSCRIBE', headers=msg_headers, ip=EventListener.hip, timeout=5)
+    sid = resp.header('SID', '') if resp.code == '200' else ''
+    if not sid or not EventListener.is_running:
+      self.logger.log(1, 'subscrresubscrfailure', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], old_sid)
+      return None
+    EventListener.CurrentSEQ = None
+    EventListener.EventsLog.clear()
+    for warning in tuple(EventListener.Warnings):
+      with warning.lock:
+        warning.TriggerSEQ = None
+    EventListener.SID = sid
+    EventListener.event_notification_listener.index_sid(EventListener, old_sid)
+    self._subscription_granted(EventListener, resp)
+    self.logger.log(1, 'subscrresubscrsuccess', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], sid, old_sid, resp.header('TIMEOUT', ''))
+    return True
+
+  def renew_event_subscription(self, EventListener, timeout):
+    if not EventListener:
+      return None
+    resp = self._renew_subscription(EventListener, timeout)
+    if resp.code != '200':
+      if EventListener.Device.StateCache is not None:
+        EventListener.Device.StateCache.detach(EventListener)
       return None
-    self.logger.log(1, 'subscrrenewsuccess', EventListener.Device.FriendlyName, EventListener.Service.Id[23:], EventListener.SID, resp.header('TIMEOUT', ''))
     return True
     
   def send_event_unsubscription(self, EventListener):
@@ -1577,7 +3584,12 @@ class DLNAHandler:
     msg_headers = {
     'SID': '%s' % EventListener.SID
     }
+    if self.subscription_renewer is not None:
+      self.subscription_renewer.remove(EventListener)
+    EventListener.is_running = None
     EventListener.event_notification_listener.unregister(EventListener)
+    if EventListener.Device.StateCache is not None:
+      EventListener.Device.StateCache.detach(EventListener)
     resp = HTTPRequest(EventListener.Service.SubscrEventURL, method='UNSUBSCRIBE', headers=msg_headers, ip=EventListener.hip, timeout=5)
     if EventListener.event_notification_listener.private:
       EventListener.event_notification_listener.stop()
@@ -1590,7 +3602,16 @@ class DLNAHandler:
   def add_event_warning(self, EventListener, property, *values, WarningEvent=None):
     warning = DLNAEventWarning(EventListener, property, *values, WarningEvent=WarningEvent)
     EventListener.Warnings.append(warning)
+    EventListener.warnings_version += 1
     return warning
+
+  def remove_event_warning(self, EventListener, warning):
+    try:
+      EventListener.Warnings.remove(warning)
+      EventListener.warnings_version += 1
+      return True
+    except:
+      return False
     
   def wait_for_warning(self, warning, timeout=None, clear=None):
     if clear:
@@ -1620,11 +3641,11 @@ class DLNAController(DLNAHandler):
 
   DEVICE_TYPE = 'Renderer'
 
-  def __init__(self, ip='', verbosity=0):
-    super().__init__(ip, verbosity)
+  def __init__(self, ip='', verbosity=0, description_cache=None, lazy_scpd=False, scpd_connections=3, scpd_deadline=10):
+    super().__init__(ip, verbosity, description_cache, lazy_scpd, scpd_connections, scpd_deadline)
     self.Renderers = self.Devices
 
-  def _build_didl(self, uri, title, kind=None, size=None, duration=None, suburi=None):
+  def _build_didl(self, uri, title, kind=None, size=None, duration=None, suburi=None, local=False):
     if size:
       size_arg = ' size="%s"' % (size)
     else:
@@ -1665,152 +3686,365 @@ class DLNAController(DLNAHandler):
       '%s' \
       '</item>' \
       '</DIDL-Lite>' % (media_class, html.escape(title), size_arg, duration_arg, html.escape(uri), '<sec:CaptionInfoEx sec:type="%s">%s</sec:CaptionInfoEx>' %(html.escape(subtype), html.escape(suburi)) if suburi else '')
+    if local:
+      didl_lite = didl_lite.replace(' sec:URIType="public"', '').replace('DLNA.ORG_OP=00', 'DLNA.ORG_OP=01').replace('DLNA.ORG_FLAGS=017', 'DLNA.ORG_FLAGS=217')
     return didl_lite
-    
-  def send_URI(self, renderer, uri, title, kind=None, size=None, duration=None, suburi=None, stop=None):
-    didl_lite = self._build_didl(uri, title, kind, size, duration, suburi)
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'SetAVTransportURI', soap_timeout=20,  soap_stop=stop, InstanceID=0, CurrentURI=uri, CurrentURIMetaData=didl_lite)
+
+  def _command_send_URI(self, uri, title, kind=None, size=None, duration=None, suburi=None):
+    return 'AVTransport', 'SetAVTransportURI', 20, {'InstanceID': 0, 'CurrentURI': uri, 'CurrentURIMetaData': self._build_didl(uri, title, kind, size, duration, suburi)}, None
+
+  def _command_send_Local_URI(self, uri, title, kind=None, size=None, duration=None, suburi=None):
+    return 'AVTransport', 'SetAVTransportURI', 20, {'InstanceID': 0, 'CurrentURI': uri, 'CurrentURIMetaData': self._build_didl(uri, title, kind, size, duration, suburi, local=True)}, None
+
+  def _command_send_URI_Next(self, uri, title, kind=None, size=None, duration=None, suburi=None):
+    return 'AVTransport', 'SetNextAVTransportURI', 20, {'InstanceID': 0, 'NextURI': uri, 'NextURIMetaData': self._build_didl(uri, title, kind, size, duration, suburi)}, None
+
+  def _command_send_Local_URI_Next(self, uri, title, kind=None, size=None, duration=None, suburi=None):
+    return 'AVTransport', 'SetNextAVTransportURI', 20, {'InstanceID': 0, 'NextURI': uri, 'NextURIMetaData': self._build_didl(uri, title, kind, size, duration, suburi, local=True)}, None
+
+  def _command_send_Play(self):
+    return 'AVTransport', 'Play', 5, {'InstanceID': 0, 'Speed': 1}, None
+
+  def _command_send_Stop(self):
+    return 'AVTransport', 'Stop', 5, {'InstanceID': 0}, None
+
+  def _command_send_Pause(self):
+    return 'AVTransport', 'Pause', 5, {'InstanceID': 0}, None
+
+  def _command_send_Seek(self, target="0:00:00"):
+    return 'AVTransport', 'Seek', 5, {'InstanceID': 0, 'Unit': 'REL_TIME', 'Target': target}, None
+
+  def _command_get_Position(self):
+    return 'AVTransport', 'GetPositionInfo', 3, {'InstanceID': 0}, 'RelTime'
+
+  def _command_get_Duration(self):
+    return 'AVTransport', 'GetMediaInfo', 3, {'InstanceID': 0}, 'MediaDuration'
+
+  def _command_get_Duration_Fallback(self):
+    return 'AVTransport', 'GetPositionInfo', 3, {'InstanceID': 0}, 'TrackDuration'
+
+  def _command_get_TransportInfo(self):
+    return 'AVTransport', 'GetTransportInfo', 5, {'InstanceID': 0}, ('CurrentTransportState', 'CurrentTransportStatus')
+
+  def _command_get_Mute(self):
+    return 'RenderingControl', 'GetMute', 5, {'InstanceID': 0, 'Channel': 'Master'}, 'CurrentMute'
+
+  def _command_set_Mute(self, mute=False):
+    return 'RenderingControl', 'SetMute', 5, {'InstanceID': 0, 'Channel': 'Master', 'DesiredMute': (1 if mute else 0)}, None
+
+  def _command_get_Volume(self):
+    return 'RenderingControl', 'GetVolume', 5, {'InstanceID': 0, 'Channel': 'Master'}, 'CurrentVolume'
+
+  def _command_set_Volume(self, volume=0):
+    return 'RenderingControl', 'SetVolume', 5, {'InstanceID': 0, 'Channel': 'Master', 'DesiredVolume': volume}, None
+
+  def _command_get_StoppedReason(self):
+    return 'AVTransport', 'X_GetStoppedReason', 5, {'InstanceID': 0}, ('StoppedReason', 'StoppedReasonData')
+
+  @staticmethod
+  def _command_result(out_args, outputs):
     if not out_args:
       return None
-    else:
+    if outputs is None:
       return True
-      
+    if isinstance(outputs, str):
+      return out_args[outputs]
+    return tuple(out_args[output] for output in outputs)
+
+  def _send_command(self, renderer, command, stop=None):
+    service, action, soap_timeout, arguments, outputs = command
+    return self._command_result(self.send_soap_msg(renderer, service, action, soap_timeout=soap_timeout, soap_stop=stop, **arguments), outputs)
+
+  def _submit_command(self, renderer, command):
+    service, action, soap_timeout, arguments, outputs = command
+    return self.submit_soap_msg(renderer, service, action, soap_timeout, None, **arguments)
+
+  def send_URI(self, renderer, uri, title, kind=None, size=None, duration=None, suburi=None, stop=None):
+    return self._send_command(renderer, self._command_send_URI(uri, title, kind, size, duration, suburi), stop)
+
   def send_Local_URI(self, renderer, uri, title, kind=None, size=None, duration=None, suburi=None, stop=None):
-    didl_lite = self._build_didl(uri, title, kind, size, duration, suburi)
-    didl_lite = didl_lite.replace(' sec:URIType="public"', '').replace('DLNA.ORG_OP=00', 'DLNA.ORG_OP=01').replace('DLNA.ORG_FLAGS=017', 'DLNA.ORG_FLAGS=217')
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'SetAVTransportURI', soap_timeout=20, soap_stop=stop, InstanceID=0, CurrentURI=uri, CurrentURIMetaData=didl_lite)
-    if not out_args:
-      return None
-    else:
-      return True
+    return self._send_command(renderer, self._command_send_Local_URI(uri, title, kind, size, duration, suburi), stop)
 
   def send_URI_Next(self, renderer, uri, title, kind=None, size=None, duration=None, suburi=None, stop=None):
-    didl_lite = self._build_didl(uri, title, kind, size, duration, suburi)
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'SetNextAVTransportURI', soap_timeout=20,  soap_stop=stop, InstanceID=0, NextURI=uri, NextURIMetaData=didl_lite)
-    if not out_args:
-      return None
-    else:
-      return True
-      
+    return self._send_command(renderer, self._command_send_URI_Next(uri, title, kind, size, duration, suburi), stop)
+
   def send_Local_URI_Next(self, renderer, uri, title, kind=None, size=None, duration=None, suburi=None, stop=None):
-    didl_lite = self._build_didl(uri, title, kind, size, duration, suburi)
-    didl_lite = didl_lite.replace(' sec:URIType="public"', '').replace('DLNA.ORG_OP=00', 'DLNA.ORG_OP=01').replace('DLNA.ORG_FLAGS=017', 'DLNA.ORG_FLAGS=217')
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'SetNextAVTransportURI', soap_timeout=20, soap_stop=stop, InstanceID=0, NextURI=uri, NextURIMetaData=didl_lite)
-    if not out_args:
-      return None
-    else:
-      return True
+    return self._send_command(renderer, self._command_send_Local_URI_Next(uri, title, kind, size, duration, suburi), stop)
 
-  def send_Play(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'Play', InstanceID=0, Speed=1)
-    if not out_args:
-      return None
-    else:
-      return True
+  def send_Play(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_send_Play(), stop)
 
-  def send_Stop(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'Stop', InstanceID=0)
-    if not out_args:
-      return None
-    else:
-      return True
-      
-  def send_Pause(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'Pause', InstanceID=0)
-    if not out_args:
-      return None
-    else:
-      return True
+  def send_Stop(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_send_Stop(), stop)
 
-  def send_Seek(self, renderer, target="0:00:00"):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'Seek', InstanceID=0, Unit="REL_TIME", Target=target)
-    if not out_args:
-      return None
-    else:
-      return True
+  def send_Pause(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_send_Pause(), stop)
 
-  def get_Position(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'GetPositionInfo', soap_timeout=3, InstanceID=0)
-    if not out_args:
-      return None
-    return out_args['RelTime']
+  def send_Seek(self, renderer, target="0:00:00", stop=None):
+    return self._send_command(renderer, self._command_send_Seek(target), stop)
 
-  def get_Duration(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'GetMediaInfo', soap_timeout=3, InstanceID=0)
-    if not out_args:
-      return None
-    return out_args['MediaDuration']
+  def get_Position(self, renderer, stop=None):
+    state_cache = self.state_cache(renderer)
+    if state_cache is not None:
+      return state_cache.get(('RelTime',), partial(self._get_Position, renderer, stop))
+    return self._get_Position(renderer, stop)
 
-  def get_Duration_Fallback(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'GetPositionInfo', soap_timeout=3, InstanceID=0)
-    if not out_args:
-      return None
-    return out_args['TrackDuration']
+  def _get_Position(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_get_Position(), stop)
 
-  def get_TransportInfo(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'GetTransportInfo', InstanceID=0)
-    if not out_args:
+  def position_tracker(self, renderer, resync_interval=10, drift_tolerance=1):
+    if not renderer:
       return None
-    return out_args['CurrentTransportState'], out_args['CurrentTransportStatus']
+    with self.device_state_lock:
+      if renderer.PositionTracker is None:
+        renderer.PositionTracker = DLNAPositionTracker(self, renderer, resync_interval, drift_tolerance)
+      return renderer.PositionTracker
 
-  def get_Mute(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'RenderingControl', 'GetMute', InstanceID=0, Channel='Master')
-    if not out_args:
-      return None
-    return out_args['CurrentMute']
+  def get_Interpolated_Position(self, renderer):
+    position_tracker = self.position_tracker(renderer)
+    return None if position_tracker is None else position_tracker.position()
 
-  def set_Mute(self, renderer, mute=False):
-    out_args = self.send_soap_msg(renderer, 'RenderingControl', 'SetMute', InstanceID=0, Channel='Master', DesiredMute=(1 if mute else 0))
-    if not out_args:
-      return None
-    return True
+  def get_Duration(self, renderer, stop=None):
+    state_cache = self.state_cache(renderer)
+    if state_cache is not None:
+      return state_cache.get(('MediaDuration',), partial(self._get_Duration, renderer, stop))
+    return self._get_Duration(renderer, stop)
 
-  def get_Volume(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'RenderingControl', 'GetVolume', InstanceID=0, Channel='Master')
-    if not out_args:
-      return None
-    return out_args['CurrentVolume']
+  def _get_Duration(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_get_Duration(), stop)
 
-  def set_Volume(self, renderer, volume=0):
-    out_args = self.send_soap_msg(renderer, 'RenderingControl', 'SetVolume', InstanceID=0, Channel='Master', DesiredVolume=volume)
-    if not out_args:
-      return None
-    return True
+  def get_Duration_Fallback(self, renderer, stop=None):
+    state_cache = self.state_cache(renderer)
+    if state_cache is not None:
+      return state_cache.get(('TrackDuration',), partial(self._get_Duration_Fallback, renderer, stop))
+    return self._get_Duration_Fallback(renderer, stop)
 
-  def get_StoppedReason(self, renderer):
-    out_args = self.send_soap_msg(renderer, 'AVTransport', 'X_GetStoppedReason', InstanceID=0)
-    if not out_args:
-      return None
-    return out_args['StoppedReason'], out_args['StoppedReasonData']
+  def _get_Duration_Fallback(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_get_Duration_Fallback(), stop)
+
+  def get_TransportInfo(self, renderer, stop=None):
+    state_cache = self.state_cache(renderer)
+    if state_cache is not None:
+      return state_cache.get(('TransportState', 'TransportStatus'), partial(self._get_TransportInfo, renderer, stop))
+    return self._get_TransportInfo(renderer, stop)
+
+  def _get_TransportInfo(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_get_TransportInfo(), stop)
+
+  def get_Mute(self, renderer, stop=None):
+    state_cache = self.state_cache(renderer)
+    if state_cache is not None:
+      return state_cache.get(('Mute',), partial(self._get_Mute, renderer, stop))
+    return self._get_Mute(renderer, stop)
+
+  def _get_Mute(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_get_Mute(), stop)
+
+  def set_Mute(self, renderer, mute=False, stop=None):
+    return self._send_command(renderer, self._command_set_Mute(mute), stop)
+
+  def get_Volume(self, renderer, stop=None):
+    state_cache = self.state_cache(renderer)
+    if state_cache is not None:
+      return state_cache.get(('Volume',), partial(self._get_Volume, renderer, stop))
+    return self._get_Volume(renderer, stop)
+
+  def _get_Volume(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_get_Volume(), stop)
+
+  def set_Volume(self, renderer, volume=0, stop=None):
+    return self._send_command(renderer, self._command_set_Volume(volume), stop)
+
+  def submit_Volume(self, renderer, volume=0):
+    return self._submit_command(renderer, self._command_set_Volume(volume))
+
+  def submit_Mute(self, renderer, mute=False):
+    return self._submit_command(renderer, self._command_set_Mute(mute))
+
+  def submit_Seek(self, renderer, target="0:00:00"):
+    return self._submit_command(renderer, self._command_send_Seek(target))
+
+  def get_StoppedReason(self, renderer, stop=None):
+    return self._send_command(renderer, self._command_get_StoppedReason(), stop)
 
   @staticmethod
-  def _process_lastchange(value):
+  def _process_lastchange(value, channels=None):
+    reported = 0 if channels is None else len(channels)
     try:
-      lc_xml = minidom.parseString(value)
-      changes = []
-      for node in lc_xml.documentElement.childNodes:
-        if node.nodeType == node.ELEMENT_NODE:
-          break
-      if node.nodeType == node.ELEMENT_NODE:
-        for p_node in node.childNodes:
-          if p_node.nodeType == p_node.ELEMENT_NODE:
-            lc_prop_name = p_node.localName
-            lc_prop_value = None
-            for att in p_node.attributes.items():
-              if att[0].lower() == 'val':
-                lc_prop_value = att[1]
-                break
-            if lc_prop_value != None:
-              changes.append((lc_prop_name, lc_prop_value))
-      return changes
+      return _XMLExtractLastChange(value, channels)
     except:
-      return DLNAHandler._process_lastchange(value)
+      if channels is not None:
+        del channels[reported:]
+      return DLNAHandler._process_lastchange(value, channels)
 
   def new_event_subscription(self, *args, **kwargs):
     EventListener = super().new_event_subscription(*args, **kwargs)
     EventListener.Renderer = EventListener.Device
     return EventListener
 
+  @staticmethod
+  def _group_steps(steps):
+    return tuple((step[0], tuple(step[1]) if len(step) > 1 else (), dict(step[2]) if len(step) > 2 else {}) for step in steps)
+
+  def _group_run(self, renderer, steps, timeout):
+    stop = threading.Event()
+    timer = None
+    if timeout is not None:
+      timer = threading.Timer(timeout, stop.set)
+      timer.daemon = True
+      timer.start()
+    done = 0
+    result = None
+    status = DLNAGroupResult.SUCCESS
+    start_time = time.monotonic()
+    try:
+      for method, args, kwargs in steps:
+        if isinstance(method, str):
+          if hasattr(self, '_command_' + method):
+            kwargs = dict(kwargs, stop=stop)
+          method = getattr(self, method)
+        step_result = method(renderer, *args, **kwargs)
+        if stop.is_set():
+          status = DLNAGroupResult.TIMEOUT
+          break
+        if step_result is None:
+          status = DLNAGroupResult.FAILURE
+          break
+        done += 1
+        result = step_result
+    except Exception as e:
+      status = DLNAGroupResult.TIMEOUT if stop.is_set() else DLNAGroupResult.FAILURE
+      result = e
+    finally:
+      if timer is not None:
+        timer.cancel()
+    return DLNAGroupResult(renderer, status, result, time.monotonic() - start_time, done)
+
+  def group_sequence(self, renderers, steps, concurrency=16, timeout=None):
+    steps = self._group_steps(steps)
+    renderers = list(renderers)
+    if not renderers:
+      return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(renderers))), thread_name_prefix='group') as executor:
+      return list(executor.map(partial(self._group_run, steps=steps, timeout=timeout), renderers))
+
+  def group_command(self, renderers, method, *args, concurrency=16, timeout=None, **kwargs):
+    return self.group_sequence(renderers, ((method, args, kwargs),), concurrency=concurrency, timeout=timeout)
+
+
+class DLNAGroupResult:
+
+  __slots__ = ('Renderer', 'Status', 'Result', 'Latency', 'Steps')
+
+  SUCCESS = 'success'
+  FAILURE = 'failure'
+  TIMEOUT = 'timeout'
+
+  def __init__(self, renderer, status, result=None, latency=None, steps=0):
+    self.Renderer = renderer
+    self.Status = status
+    self.Result = result
+    self.Latency = latency
+    self.Steps = steps
+
+  def __bool__(self):
+    return self.Status == self.SUCCESS
+
+  def __repr__(self):
+    return '<DLNAGroupResult %s: %s after %s step(s) in %s s>' % (getattr(self.Renderer, 'FriendlyName', None), self.Status, self.Steps, None if self.Latency is None else round(self.Latency, 3))
+
+
+class AsyncDLNAController:
+
+  def __init__(self, controller=None, ip='', verbosity=0, **kwargs):
+    self.Controller = controller if controller is not None else DLNAController(ip, verbosity, **kwargs)
+    self.Renderers = self.Controller.Renderers
+
+  def __getattr__(self, name):
+    build = getattr(self.Controller, '_command_' + name, None)
+    if build is None:
+      return getattr(self.Controller, name)
+    async def command(renderer, *args, stop=None, **kwargs):
+      return await self._send_command(renderer, build(*args, **kwargs), stop)
+    command.__name__ = name
+    return command
+
+  async def discover(self, uuid=None, timeout=2, alive_persistence=0, max_fetches=8):
+    return await self.Controller.discover_async(uuid, timeout, alive_persistence, max_fetches)
+
+  async def _group_run(self, semaphore, renderer, steps, timeout):
+    async with semaphore:
+      progress = [0, None]
+      async def run_steps():
+        for method, args, kwargs in steps:
+          result = await (getattr(self, method) if isinstance(method, str) else method)(renderer, *args, **kwargs)
+          if result is None:
+            return False
+          progress[0] += 1
+          progress[1] = result
+        return True
+      start_time = time.monotonic()
+      try:
+        status = DLNAGroupResult.SUCCESS if await asyncio.wait_for(run_steps(), timeout) else DLNAGroupResult.FAILURE
+      except asyncio.TimeoutError:
+        status = DLNAGroupResult.TIMEOUT
+      except Exception as e:
+        status = DLNAGroupResult.FAILURE
+        progress[1] = e
+      return DLNAGroupResult(renderer, status, progress[1], time.monotonic() - start_time, progress[0])
+
+  async def group_sequence(self, renderers, steps, concurrency=16, timeout=None):
+    steps = DLNAController._group_steps(steps)
+    semaphore = asyncio.Semaphore(concurrency)
+    return list(await asyncio.gather(*(self._group_run(semaphore, renderer, steps, timeout) for renderer in renderers)))
+
+  async def group_command(self, renderers, method, *args, concurrency=16, timeout=None, **kwargs):
+    return await self.group_sequence(renderers, ((method, args, kwargs),), concurrency=concurrency, timeout=timeout)
+
+  async def send_soap_msg(self, device, service, action, soap_timeout=5, soap_stop=None, **arguments):
+    controller = self.Controller
+    if not device:
+      return None
+    if controller.command_queuing:
+      queued_stop = threading.Event() if soap_stop is None else soap_stop
+      try:
+        return await asyncio.wrap_future(controller.submit_soap_msg(device, service, action, soap_timeout, queued_stop, **arguments))
+      except asyncio.CancelledError:
+        if soap_stop is None:
+          queued_stop.set()
+        raise
+    ip = device.Hip
+    if ip is None:
+      return None
+    serv = device.ServicesIndex.get('urn:upnp-org:serviceId:' + service)
+    if serv is not None and not serv.Loaded:
+      await asyncio.get_running_loop().run_in_executor(None, serv.load)
+    cturl_headers_body_oargs = controller._build_soap_msg(device, service, action, **arguments)
+    if not cturl_headers_body_oargs:
+      controller.logger.log(1, 'commandabandonment', controller.DEVICE_TYPE, device.FriendlyName, service, action)
+      return None
+    controller.logger.log(2, 'commandsending', controller.DEVICE_TYPE, device.FriendlyName, service, action)
+    breaker = controller._circuit_breaker(device)
+    breaker_state = breaker.allow() if breaker is not None else DLNACircuitBreaker.CLOSED
+    try:
+      if breaker_state == DLNACircuitBreaker.HALF_OPEN and not await asyncio.get_running_loop().run_in_executor(None, controller._breaker_probe, device, breaker, cturl_headers_body_oargs[0], ip):
+        breaker_state = None
+      if breaker_state is None:
+        controller.logger.log(1, 'commandrejected', controller.DEVICE_TYPE, device.FriendlyName, service, action)
+        return None
+      action_stats, connect_timeout, max_time = controller._soap_timeouts(device, service, action, soap_timeout)
+      start_time = time.monotonic()
+      resp = await AsyncHTTPRequest(cturl_headers_body_oargs[0], method='POST', headers=cturl_headers_body_oargs[1], data=cturl_headers_body_oargs[2], timeout=connect_timeout, max_length=104857600, max_time=max_time, stop=soap_stop, ip=ip)
+      controller._record_latency(action_stats, resp, time.monotonic() - start_time, max_time)
+      controller._breaker_record(device, resp, soap_stop)
+    finally:
+      if breaker is not None and breaker_state == DLNACircuitBreaker.HALF_OPEN:
+        breaker.abort()
+    return controller._soap_result(device, service, action, resp, cturl_headers_body_oargs[3], arguments)
+
+  async def _send_command(self, renderer, command, stop=None):
+    service, action, soap_timeout, arguments, outputs = command
+    return self.Controller._command_result(await self.send_soap_msg(renderer, service, action, soap_timeout=soap_timeout, soap_stop=stop, **arguments), outputs)
 
 class HTTPExplodedMessage:
 
@@ -1889,7 +4123,7 @@ class HTTPMessage:
     return True
 
   @staticmethod
-  def _read(message, max_data, start_time, max_time, stop):
+  def _read(message, max_data, start_time, max_time, stop, progress=None):
     is_stop = lambda : False if stop == None else stop.is_set()
     start_read_time = time.time()
     with selectors.DefaultSelector() as selector:
@@ -1913,12 +4147,15 @@ class HTTPMessage:
           ready = selector.select(rem_time)
         if ready:
           try:
-            return message.recv(min(max_data, 1048576))
+            bloc = message.recv(min(max_data, 1048576))
           except:
-            return None
+            bloc = None
+          if not bloc and progress is not None:
+            progress.append('closed')
+          return bloc
     return None
 
-  def __new__(cls, message=None, body=True, decode='utf-8', timeout=5, max_length=1048576, max_hlength=1048576, max_time=None, stop=None):
+  def __new__(cls, message=None, body=True, decode='utf-8', timeout=5, max_length=1048576, max_hlength=1048576, max_time=None, stop=None, progress=None):
     http_message = HTTPExplodedMessage()
     if message is None:
       return http_message
@@ -1944,11 +4181,13 @@ class HTTPMessage:
       if not iss or rem_length <= 0:
         return http_message
       try:
-        bloc = cls._read(message, rem_length, start_time, max_time, stop)
+        bloc = cls._read(message, rem_length, start_time, max_time, stop, (progress if not msg else None))
         if not bloc:
           return http_message
       except:
         return http_message
+      if progress is not None and not msg:
+        progress.append('received')
       rem_length -= len(bloc)
       msg = msg + bloc
     if not cls._read_headers(msg[:body_pos].decode('ISO-8859-1'), http_message):
@@ -2108,7 +4347,16 @@ class HTTPRequest:
     'Host: %s\r\n%s' \
     '\r\n'
 
-  def __new__(cls, url, method=None, headers=None, data=None, timeout=3, max_length=1048576, max_hlength=1048576, max_time=None, stop=None, pconnection=None, ip=''):
+  @classmethod
+  def connect(cls, url_p, timeout, ip=''):
+    if url_p.scheme.lower() == 'http':
+      return socket.create_connection((url_p.netloc + ':80').split(':', 2)[:2], timeout=timeout, source_address=(ip, 0))
+    elif url_p.scheme.lower() == 'https':
+      return cls.SSLContext.wrap_socket(socket.create_connection((url_p.netloc + ':443').split(':', 2)[:2], timeout=timeout, source_address=(ip, 0)), server_side=False, server_hostname=url_p.netloc.split(':')[0])
+    else:
+      raise ValueError(url_p.scheme)
+
+  def __new__(cls, url, method=None, headers=None, data=None, timeout=3, max_length=1048576, max_hlength=1048576, max_time=None, stop=None, pconnection=None, ip='', progress=None):
     if url is None:
       return HTTPMessage()
     is_stop = lambda : False if stop == None else stop.is_set()
@@ -2144,12 +4392,7 @@ class HTTPRequest:
         if is_stop():
           raise
         if pconnection[0] is None:
-          if url_p.scheme.lower() == 'http':
-            pconnection[0] = socket.create_connection((url_p.netloc + ':80').split(':', 2)[:2], timeout=timeout, source_address=(ip, 0))
-          elif url_p.scheme.lower() == 'https':
-            pconnection[0] = cls.SSLContext.wrap_socket(socket.create_connection((url_p.netloc + ':443').split(':', 2)[:2], timeout=timeout, source_address=(ip, 0)), server_side=False, server_hostname=url_p.netloc.split(':')[0])
-          else:
-            raise
+          pconnection[0] = cls.connect(url_p, timeout, ip)
         else:
           try:
             pconnection[0].settimeout(timeout)
@@ -2162,6 +4405,8 @@ class HTTPRequest:
           raise
         msg = cls.RequestPattern % (method, (url_p.path + ('?' + url_p.query if url_p.query else '')).replace(' ', '%20') or '/', url_p.netloc, ''.join(k + ': ' + v + '\r\n' for k, v in headers.items()))
         pconnection[0].sendall(msg.encode('iso-8859-1') + (data or b''))
+        if progress is not None:
+          progress.append('sent')
         code = '100'
         while code == '100':
           if max_time:
@@ -2170,7 +4415,7 @@ class HTTPRequest:
               raise
           if is_stop():
             raise
-          resp = HTTPMessage(pconnection[0], body=(method.upper() != 'HEAD'), decode=None, timeout=timeout, max_length=max_length, max_time=(rem_time if max_time else None), stop=stop)
+          resp = HTTPMessage(pconnection[0], body=(method.upper() != 'HEAD'), decode=None, timeout=timeout, max_length=max_length, max_time=(rem_time if max_time else None), stop=stop, progress=progress)
           code = resp.code
           if code == '100':
             redir += 1
@@ -2219,6 +4464,256 @@ class HTTPRequest:
       pconnection[0] = None
     return resp
 
+class HTTPConnectionPool:
+
+  def __init__(self, max_per_host=2, idle_timeout=30):
+    self.max_per_host = max_per_host
+    self.idle_timeout = idle_timeout
+    self.Idle = {}
+    self.Busy = {}
+    self.Created = 0
+    self.Reused = 0
+    self.Evicted = 0
+    self.Retried = 0
+    self.condition = threading.Condition()
+    self.last_sweep = time.monotonic()
+
+  @staticmethod
+  def _close(pconnection):
+    try:
+      pconnection[0].close()
+    except:
+      pass
+    pconnection[0] = None
+
+  @staticmethod
+  def _healthy(sock):
+    try:
+      if hasattr(sock, 'pending') and sock.pending():
+        return False
+      with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_READ)
+        return not selector.select(0)
+    except:
+      return False
+
+  def _sweep(self, now):
+    self.last_sweep = now
+    for key in list(self.Idle.keys()):
+      idle = self.Idle[key]
+      while idle and now - idle[0][1] > self.idle_timeout:
+        self._close(idle.pop(0)[0])
+        self.Evicted += 1
+      if not idle:
+        del self.Idle[key]
+
+  def acquire(self, key, timeout=None, stop=None):
+    end_time = None if timeout is None else time.monotonic() + timeout
+    with self.condition:
+      while True:
+        if stop is not None and stop.is_set():
+          return None, False
+        now = time.monotonic()
+        if now - self.last_sweep > self.idle_timeout:
+          self._sweep(now)
+        idle = self.Idle.get(key)
+        while idle:
+          pconnection, last_use = idle.pop()
+          if now - last_use > self.idle_timeout or not self._healthy(pconnection[0]):
+            self._close(pconnection)
+            self.Evicted += 1
+            continue
+          self.Busy[key] = self.Busy.get(key, 0) + 1
+          self.Reused += 1
+          return pconnection, True
+        if self.Busy.get(key, 0) < self.max_per_host:
+          self.Busy[key] = self.Busy.get(key, 0) + 1
+          self.Created += 1
+          return [None], False
+        rem_time = None if end_time is None else end_time - now
+        if rem_time is not None and rem_time <= 0:
+          return None, False
+        self.condition.wait(rem_time if stop is None else min(rem_time or 0.5, 0.5))
+
+  def release(self, key, pconnection):
+    with self.condition:
+      self.Busy[key] -= 1
+      if not self.Busy[key]:
+        del self.Busy[key]
+      if pconnection[0] is not None:
+        self.Idle.setdefault(key, []).append((pconnection, time.monotonic()))
+      self.condition.notify()
+
+  @staticmethod
+  def _connect(pconnection, url, timeout, ip, connect_stats):
+    start_time = time.monotonic()
+    try:
+      pconnection[0] = HTTPRequest.connect(urllib.parse.urlsplit(url, allow_fragments=False), timeout, ip)
+    except:
+      if connect_stats is not None and time.monotonic() - start_time >= timeout:
+        connect_stats.add(time.monotonic() - start_time, failure=True)
+      return False
+    if connect_stats is not None:
+      connect_stats.add(time.monotonic() - start_time)
+    return True
+
+  def request(self, key, url, timeout=3, connect_stats=None, **kwargs):
+    start_time = time.monotonic()
+    pconnection, reused = self.acquire(key, kwargs.get('max_time') or timeout, kwargs.get('stop'))
+    if pconnection is None:
+      return HTTPMessage()
+    if kwargs.get('max_time'):
+      kwargs['max_time'] = max(kwargs['max_time'] - time.monotonic() + start_time, 0.001)
+    try:
+      if not reused and not self._connect(pconnection, url, timeout, kwargs.get('ip', ''), connect_stats):
+        return HTTPMessage()
+      progress = []
+      resp = HTTPRequest(url, timeout=timeout, pconnection=pconnection, progress=progress, **kwargs)
+      if resp.code is None and reused and (progress == [] or progress == ['sent', 'closed']) and not (kwargs.get('stop') is not None and kwargs['stop'].is_set()):
+        self.Retried += 1
+        self._close(pconnection)
+        if not self._connect(pconnection, url, timeout, kwargs.get('ip', ''), connect_stats):
+          return HTTPMessage()
+        resp = HTTPRequest(url, timeout=timeout, pconnection=pconnection, **kwargs)
+      return resp
+    except:
+      self._close(pconnection)
+      return HTTPMessage()
+    finally:
+      self.release(key, pconnection)
+
+  def close(self, key=None):
+    with self.condition:
+      for k in ((key,) if key is not None else list(self.Idle.keys())):
+        for pconnection, last_use in self.Idle.pop(k, ()):
+          self._close(pconnection)
+
+  def stats(self):
+    with self.condition:
+      return {'created': self.Created, 'reused': self.Reused, 'evicted': self.Evicted, 'retried': self.Retried, 'idle': sum(map(len, self.Idle.values())), 'busy': sum(self.Busy.values())}
+
+
+class AsyncHTTPRequest:
+
+  SSLContext = HTTPRequest.SSLContext
+  RequestPattern = HTTPRequest.RequestPattern
+
+  def __new__(cls, url, method=None, headers=None, data=None, timeout=3, max_length=1048576, max_hlength=1048576, max_time=None, stop=None, ip=''):
+    return cls._request(url, method, headers, data, timeout, max_length, max_hlength, max_time, stop, ip)
+
+  @staticmethod
+  async def _wait_stop(stop):
+    if isinstance(stop, asyncio.Event):
+      await stop.wait()
+    else:
+      while not stop.is_set():
+        await asyncio.sleep(0.5)
+
+  @classmethod
+  async def _request(cls, url, method, headers, data, timeout, max_length, max_hlength, max_time, stop, ip):
+    if url is None or (stop is not None and stop.is_set()):
+      return HTTPMessage()
+    exchange = asyncio.ensure_future(cls._exchange(url, method, headers, data, timeout, max_length, max_hlength, ip))
+    waiters = {exchange}
+    if stop is not None:
+      waiters.add(asyncio.ensure_future(cls._wait_stop(stop)))
+    try:
+      done, pending = await asyncio.wait(waiters, timeout=max_time, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+      for task in waiters:
+        if not task.done():
+          task.cancel()
+    if not exchange in done:
+      return HTTPMessage()
+    try:
+      return exchange.result()
+    except:
+      return HTTPMessage()
+
+  @staticmethod
+  async def _read_head(reader, timeout, max_hlength):
+    lines = []
+    length = 0
+    while True:
+      line = await asyncio.wait_for(reader.readline(), timeout)
+      if not line:
+        return None
+      length += len(line)
+      if length > max_hlength:
+        return None
+      if line in (b'\r\n', b'\n'):
+        if lines:
+          lines.append(b'\r\n')
+          return b''.join(lines)
+        continue
+      lines.append(line)
+
+  @classmethod
+  async def _exchange(cls, url, method, headers, data, timeout, max_length, max_hlength, ip):
+    if method is None:
+      method = 'GET' if data is None else 'POST'
+    url_p = urllib.parse.urlsplit(url, allow_fragments=False)
+    if url_p.scheme.lower() == 'http':
+      host, port = (url_p.netloc + ':80').split(':', 2)[:2]
+      ssl_context = None
+    elif url_p.scheme.lower() == 'https':
+      host, port = (url_p.netloc + ':443').split(':', 2)[:2]
+      ssl_context = cls.SSLContext
+    else:
+      return HTTPMessage()
+    hitems = (headers or {}).items()
+    headers = {k: v for k, v in hitems if not k.lower() in ('host', 'content-length', 'connection', 'expect')}
+    if not 'accept-encoding' in (k.lower() for k, v in hitems):
+      headers['Accept-Encoding'] = 'identity'
+    if data is not None:
+      headers['Content-Length'] = str(len(data))
+    headers['Connection'] = 'close'
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port), ssl=ssl_context, server_hostname=(host if ssl_context else None), local_addr=((ip, 0) if ip else None), limit=max_hlength), timeout)
+    try:
+      msg = cls.RequestPattern % (method, (url_p.path + ('?' + url_p.query if url_p.query else '')).replace(' ', '%20') or '/', url_p.netloc, ''.join(k + ': ' + v + '\r\n' for k, v in headers.items()))
+      writer.write(msg.encode('iso-8859-1') + (data or b''))
+      await asyncio.wait_for(writer.drain(), timeout)
+      resp = HTTPExplodedMessage()
+      while resp.code in (None, '100'):
+        head = await cls._read_head(reader, timeout, max_hlength)
+        if head is None or not HTTPMessage._read_headers(head.decode('ISO-8859-1'), resp.clear()):
+          return resp.clear()
+      if resp.code in ('101', '204', '304') or method.upper() == 'HEAD':
+        resp.body = b''
+      elif resp.in_header('Transfer-Encoding', 'chunked'):
+        bbuf = BytesIO()
+        while True:
+          chunk_len = int((await asyncio.wait_for(reader.readline(), timeout)).split(b';', 1)[0].strip(), 16)
+          if not chunk_len:
+            break
+          if bbuf.tell() + chunk_len > max_length:
+            return resp.clear()
+          bbuf.write(await asyncio.wait_for(reader.readexactly(chunk_len), timeout))
+          await asyncio.wait_for(reader.readline(), timeout)
+        while (await asyncio.wait_for(reader.readline(), timeout)).strip():
+          pass
+        resp.body = bbuf.getvalue()
+      elif resp.header('Content-Length') is not None:
+        body_len = max(0, int(resp.header('Content-Length')))
+        if body_len > max_length:
+          return resp.clear()
+        resp.body = await asyncio.wait_for(reader.readexactly(body_len), timeout)
+      elif resp.code in ('200', '206') and resp.expect_close:
+        bbuf = BytesIO()
+        while True:
+          bloc = await asyncio.wait_for(reader.read(1048576), timeout)
+          if not bloc:
+            break
+          if bbuf.write(bloc) and bbuf.tell() > max_length:
+            return resp.clear()
+        resp.body = bbuf.getvalue()
+      else:
+        resp.body = b''
+      return resp
+    finally:
+      writer.close()
+
+
 class log_event:
 
   def __init__(self, kmod, verbosity):
@@ -0,0 +1,221 @@
+import timeit
+import html
+from xml.dom import minidom
+try:
+  from dlna import dlna
+except ImportError:
+  import dlna
+
+DESCRIPTION = '''<?xml version="1.0"?>
+<root xmlns="urn:schemas-upnp-org:device-1-0" xmlns:dlna="urn:schemas-dlna-org:device-1-0" xmlns:sec="http://www.sec.co.kr/dlna">
+<specVersion><major>1</major><minor>0</minor></specVersion>
+<device>
+<deviceType>urn:schemas-upnp-org:device:MediaRenderer:1</deviceType>
+<pnpx:X_compatibleId xmlns:pnpx="http://schemas.microsoft.com/windows/pnpx/2005/11">MS_DigitalMediaDeviceClass_DMR_V001</pnpx:X_compatibleId>
+<dlna:X_DLNADOC>DMR-1.50</dlna:X_DLNADOC>
+<friendlyName>[TV] Living room</friendlyName>
+<manufacturer>Samsung Electronics</manufacturer>
+<manufacturerURL>http://www.samsung.com/sec</manufacturerURL>
+<modelDescription>Samsung TV DMR</modelDescription>
+<modelName>UE55RU7405</modelName>
+<modelNumber>AllShare1.0</modelNumber>
+<serialNumber>20090804RCR</serialNumber>
+<UDN>uuid:3b4c8a5e-1234-4cde-8f00-a1b2c3d4e5f6</UDN>
+<sec:deviceID></sec:deviceID>
+<iconList>
+<icon><mimetype>image/jpeg</mimetype><width>48</width><height>48</height><depth>24</depth><url>/dmr/icon_SML.jpg</url></icon>
+<icon><mimetype>image/jpeg</mimetype><width>120</width><height>120</height><depth>24</depth><url>/dmr/icon_LRG.jpg</url></icon>
+<icon><mimetype>image/png</mimetype><width>48</width><height>48</height><depth>24</depth><url>/dmr/icon_SML.png</url></icon>
+<icon><mimetype>image/png</mimetype><width>120</width><height>120</height><depth>24</depth><url>/dmr/icon_LRG.png</url></icon>
+</iconList>
+<serviceList>
+<service><serviceType>urn:schemas-upnp-org:service:RenderingControl:1</serviceType><serviceId>urn:upnp-org:serviceId:RenderingControl</serviceId><controlURL>/upnp/control/RenderingControl1</controlURL><eventSubURL>/upnp/event/RenderingControl1</eventSubURL><SCPDURL>RenderingControl_1.xml</SCPDURL></service>
+<service><serviceType>urn:schemas-upnp-org:service:ConnectionManager:1</serviceType><serviceId>urn:upnp-org:serviceId:ConnectionManager</serviceId><controlURL>/upnp/control/ConnectionManager1</controlURL><eventSubURL>/upnp/event/ConnectionManager1</eventSubURL><SCPDURL>ConnectionManager_1.xml</SCPDURL></service>
+<service><serviceType>urn:schemas-upnp-org:service:AVTransport:1</serviceType><serviceId>urn:upnp-org:serviceId:AVTransport</serviceId><controlURL>/upnp/control/AVTransport1</controlURL><eventSubURL>/upnp/event/AVTransport1</eventSubURL><SCPDURL>AVTransport_1.xml</SCPDURL></service>
+</serviceList>
+<sec:ProductCap>Tuner,Y2019,WebURIPlayable,SeekTRACK_NR,NavigateInPause,ScreenMirroringP2PMAC=c0:48:e6:00:00:00</sec:ProductCap>
+</device>
+</root>'''
+
+def _scpd(actions, statevars):
+  return \
+    '<?xml version="1.0"?>\n' \
+    '<scpd xmlns="urn:schemas-upnp-org:service-1-0">\n' \
+    '<specVersion><major>1</major><minor>0</minor></specVersion>\n' \
+    '<actionList>\n%s</actionList>\n' \
+    '<serviceStateTable>\n%s</serviceStateTable>\n' \
+    '</scpd>' % (''.join(
+      '<action>\n<name>%s</name>\n<argumentList>\n%s</argumentList>\n</action>\n' % (name, ''.join('<argument>\n<name>%s</name>\n<direction>%s</direction>\n<relatedStateVariable>%s</relatedStateVariable>\n</argument>\n' % arg for arg in args)) for name, args in actions), ''.join(
+      '<stateVariable sendEvents="%s">\n<name>%s</name>\n<dataType>%s</dataType>\n%s</stateVariable>\n' % statevar for statevar in statevars))
+
+SCPD = _scpd(
+  [('X_Action%d' % a, [('InstanceID', 'in', 'A_ARG_TYPE_InstanceID')] + [('Arg%d' % r, 'in' if r % 2 else 'out', 'X_Var%d' % ((a + r) % 60)) for r in range(6)]) for a in range(50)],
+  [('no', 'A_ARG_TYPE_InstanceID', 'ui4', ''), ('yes', 'LastChange', 'string', '')] +
+  [('no', 'X_Var%d' % v, 'ui2' if v % 3 else 'string', '<allowedValueRange><minimum>0</minimum><maximum>100</maximum><step>1</step></allowedValueRange>\n' if v % 3 else '<allowedValueList><allowedValue>A</allowedValue><allowedValue>B</allowedValue><allowedValue>C</allowedValue></allowedValueList>\n') for v in range(60)])
+
+SOAP_RESPONSE = (
+  '<?xml version="1.0" encoding="utf-8"?>\n'
+  '<s:Envelope s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/" xmlns:s="http://schemas.xmlsoap.org/soap/envelope/">\n'
+  '<s:Body>\n'
+  '<u:GetPositionInfoResponse xmlns:u="urn:schemas-upnp-org:service:AVTransport:1">\n'
+  '<Track>1</Track>\n'
+  '<TrackDuration>01:32:07</TrackDuration>\n'
+  '<TrackMetaData>%s</TrackMetaData>\n'
+  '<TrackURI>http://192.168.1.10:8000/media?id=42&amp;fmt=mp4</TrackURI>\n'
+  '<RelTime>00:12:41</RelTime>\n'
+  '<AbsTime>00:12:41</AbsTime>\n'
+  '<RelCount>2147483647</RelCount>\n'
+  '<AbsCount>2147483647</AbsCount>\n'
+  '</u:GetPositionInfoResponse>\n'
+  '</s:Body>\n'
+  '</s:Envelope>' % html.escape(
+  '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/">'
+  '<item restricted="1" id="PlayOn-content" parentID=""><upnp:class>object.item.videoItem</upnp:class><dc:title>Film</dc:title>'
+  '<res protocolInfo="http-get:*:video/mp4:DLNA.ORG_OP=01">http://192.168.1.10:8000/media?id=42&amp;fmt=mp4</res></item></DIDL-Lite>')).encode('utf-8')
+OUT_ARGS = ('Track', 'TrackDuration', 'TrackMetaData', 'TrackURI', 'RelTime', 'AbsTime', 'RelCount', 'AbsCount')
+
+LASTCHANGE = (
+  '<Event xmlns="urn:schemas-upnp-org:metadata-1-0/AVT/">'
+  '<InstanceID val="0">'
+  '<TransportState val="PLAYING"/>'
+  '<TransportStatus val="OK"/>'
+  '<CurrentPlayMode val="NORMAL"/>'
+  '<TransportPlaySpeed val="1"/>'
+  '<NumberOfTracks val="1"/>'
+  '<CurrentTrack val="1"/>'
+  '<CurrentTrackDuration val="01:32:07"/>'
+  '<CurrentMediaDuration val="01:32:07"/>'
+  '<CurrentTrackURI val="http://192.168.1.10:8000/media?id=42&amp;fmt=mp4"/>'
+  '<AVTransportURI val="http://192.168.1.10:8000/media?id=42&amp;fmt=mp4"/>'
+  '<CurrentTransportActions val="Play,Stop,Pause,Seek"/>'
+  '</InstanceID>'
+  '</Event>')
+
+NOTIFY_BODY = (
+  '<?xml version="1.0" encoding="utf-8"?>\n'
+  '<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">'
+  '<e:property><LastChange>%s</LastChange></e:property>'
+  '</e:propertyset>' % html.escape(LASTCHANGE))
+
+LASTCHANGE_INDENTED = (
+  '<Event xmlns="urn:schemas-upnp-org:metadata-1-0/RCS/">\n'
+  '  <InstanceID val="0">\n'
+  '    <Volume channel="Master" val="24"/>\n'
+  '    <Mute channel="Master" val="0"/>\n'
+  '    <PresetNameList val="FactoryDefaults"/>\n'
+  '  </InstanceID>\n'
+  '</Event>\n')
+
+NOTIFY_BODY_INDENTED = (
+  '<?xml version="1.0" encoding="utf-8"?>\n'
+  '<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">\n'
+  '  <e:property><LastChange>%s</LastChange></e:property>\n'
+  '  <e:property><X_Brightness>42</X_Brightness></e:property>\n'
+  '  <e:property><X_Label>Living room</X_Label></e:property>\n'
+  '</e:propertyset>\n' % html.escape(LASTCHANGE_INDENTED))
+
+DESCRIPTION_TAGS = ('deviceType', 'UDN', 'friendlyName', 'manufacturer', 'modelName', 'modelDescription', 'modelNumber', 'serialNumber')
+
+
+def description_fields(root_xml):
+  fields = [dlna._XMLGetRTagText(root_xml, tag) for tag in DESCRIPTION_TAGS]
+  fields.extend((dlna._XMLGetRTagText(node, 'mimetype'), dlna._XMLGetRTagText(node, 'url')) for node in dlna._XMLGetRTagElements(root_xml, 'icon'))
+  fields.extend(tuple(dlna._XMLGetRTagText(node, tag) for tag in ('serviceType', 'serviceId', 'controlURL', 'eventSubURL', 'SCPDURL')) for node in dlna._XMLGetRTagElements(root_xml, 'service'))
+  return fields
+
+def scpd_model(root_s_xml):
+  service = dlna.DLNAService()
+  dlna.DLNAHandler._compile_scpd(service, root_s_xml)
+  return (
+    service.EventThroughLastChange,
+    [(sv.Name, sv.Event, sv.Type, sv.AllowedValueList, sv.AllowedValueRange, sv.AllowedRange, sv.DefaultValue) for sv in service.StateVariables.values()],
+    [(act.Name, [(arg.Name, arg.Direction, arg.Type, arg.Event) for arg in act.Arguments]) for act in service.Actions])
+
+def soap_minidom(body, out_args):
+  root_xml = minidom.parseString(body)
+  return {arg: dlna._XMLGetNodeText(root_xml.getElementsByTagName(arg)[0]) for arg in out_args}
+
+def properties_minidom(body):
+  root_xml = minidom.parseString(body)
+  properties = []
+  for node in root_xml.documentElement.childNodes:
+    if node.nodeType != node.ELEMENT_NODE:
+      continue
+    if node.localName.lower() != 'property':
+      continue
+    for child_node in node.childNodes:
+      try:
+        prop_name = child_node.localName
+      except:
+        continue
+      try:
+        prop_nvalue = dlna._XMLGetNodeText(child_node)
+      except:
+        continue
+      properties.append((prop_name, prop_nvalue))
+  return properties
+
+def lastchange_minidom(value):
+  try:
+    lc_xml = minidom.parseString(value)
+    changes = []
+    for node in lc_xml.documentElement.childNodes:
+      if node.nodeType == node.ELEMENT_NODE:
+        break
+    if node.nodeType == node.ELEMENT_NODE:
+      for p_node in node.childNodes:
+        if p_node.nodeType == p_node.ELEMENT_NODE:
+          lc_prop_name = p_node.localName
+          lc_prop_value = None
+          for att in p_node.attributes.items():
+            if att[0].lower() == 'val':
+              lc_prop_value = att[1]
+              break
+          if lc_prop_value != None:
+            changes.append((lc_prop_name, lc_prop_value))
+    return changes
+  except:
+    return [('LastChange', value)]
+
+def notify_minidom(body):
+  changes = []
+  try:
+    for prop_name, prop_nvalue in properties_minidom(body):
+      if prop_name.upper() == 'LastChange'.upper():
+        try:
+          changes.extend(lastchange_minidom(prop_nvalue))
+        except:
+          changes.append((prop_name, prop_nvalue))
+      else:
+        changes.append((prop_name, prop_nvalue))
+  except:
+    return None
+  return changes
+
+def notify_stream(body):
+  changes = []
+  for prop_name, prop_nvalue in dlna._XMLExtractProperties(body):
+    changes.extend(dlna._XMLExtractLastChange(prop_nvalue) if prop_name.upper() == 'LASTCHANGE' else ((prop_name, prop_nvalue),))
+  return changes
+
+CASES = (
+  ('device description', lambda: description_fields(minidom.parseString(DESCRIPTION)), lambda: description_fields(dlna._XMLParse(DESCRIPTION))),
+  ('SCPD (50 actions)', lambda: scpd_model(minidom.parseString(SCPD)), lambda: scpd_model(dlna._XMLParse(SCPD))),
+  ('GetPositionInfo response', lambda: soap_minidom(SOAP_RESPONSE, OUT_ARGS), lambda: dlna._XMLExtractSOAPResponse(SOAP_RESPONSE, OUT_ARGS)[0]),
+  ('NOTIFY with LastChange', lambda: notify_minidom(NOTIFY_BODY), lambda: notify_stream(NOTIFY_BODY)),
+  ('NOTIFY, indented', lambda: notify_minidom(NOTIFY_BODY_INDENTED), lambda: notify_stream(NOTIFY_BODY_INDENTED))
+)
+
+
+def main(number=2000):
+  for name, ref, new in CASES:
+    if ref() != new():
+      raise AssertionError('%s: output mismatch' % name)
+    n = max(1, number // 20) if 'SCPD' in name else number
+    t_ref = min(timeit.repeat(ref, number=n, repeat=3)) / n
+    t_new = min(timeit.repeat(new, number=n, repeat=3)) / n
+    print('%-26s minidom: %8.1f µs   stream: %8.1f µs   x%.1f' % (name, t_ref * 1e6, t_new * 1e6, t_ref / t_new))
+
+
+if __name__ == '__main__':
+  main()